@@ -1,18 +1,26 @@
 from django.contrib import admin
-from .models import Atendimento, Cliente, Contato, Mensagem
+from .models import (
+    Atendimento,
+    Contato,
+    FalhaWebhook,
+    Mensagem,
+    MetricaAtendimento,
+    NumeroWhatsApp,
+)
 
 
-@admin.register(Cliente)
-class ClienteAdmin(admin.ModelAdmin):
-    list_display = ("telefone", "nome")
-    search_fields = ("telefone", "nome")
+@admin.register(NumeroWhatsApp)
+class NumeroWhatsAppAdmin(admin.ModelAdmin):
+    list_display = ("nome", "phone_number_id", "mensagens_por_segundo", "workers", "ativo")
+    list_filter = ("ativo",)
+    search_fields = ("nome", "phone_number_id")
 
 
 @admin.register(Atendimento)
 class AtendimentoAdmin(admin.ModelAdmin):
     list_display = (
         "id",
-        "cliente",
+        "contato",
         "departamento",
         "status",
         "data_inicio",
@@ -20,23 +28,59 @@ class AtendimentoAdmin(admin.ModelAdmin):
     )
     list_filter = ("departamento", "status")
     list_editable = ("status",)
-    raw_id_fields = ("cliente", "agente_responsavel")
-    readonly_fields = ("data_inicio",)
+    raw_id_fields = ("contato", "agente_responsavel")
+    readonly_fields = (
+        "data_inicio",
+        "data_em_atendimento",
+        "data_finalizacao",
+        "data_primeira_resposta",
+    )
     ordering = ("-data_inicio",)
 
 
 @admin.register(Contato)
 class ContatoAdmin(admin.ModelAdmin):
-    list_display = ("nome", "waid", "atualizado_em")
+    list_display = ("nome", "waid", "numero", "mensagens_coalescidas", "atualizado_em")
+    list_filter = ("numero",)
     search_fields = ("nome", "waid")
 
 
 @admin.register(Mensagem)
 class MensagemAdmin(admin.ModelAdmin):
-    list_display = ("contato", "texto_preview", "direcao", "status", "timestamp")
-    list_filter = ("direcao", "status")
+    list_display = ("contato", "texto_preview", "direcao", "status", "numero", "timestamp")
+    list_filter = ("direcao", "status", "numero")
 
     def texto_preview(self, obj):
         return (obj.texto or "")[:50] + ("..." if len(obj.texto or "") > 50 else "")
 
     texto_preview.short_description = "Texto"
+
+
+@admin.register(FalhaWebhook)
+class FalhaWebhookAdmin(admin.ModelAdmin):
+    list_display = ("id", "fingerprint", "status", "tentativas", "criado_em", "reprocessado_em")
+    list_filter = ("status",)
+    search_fields = ("fingerprint", "erro")
+    readonly_fields = ("fingerprint", "payload", "erro", "criado_em", "atualizado_em", "reprocessado_em")
+
+
+@admin.register(MetricaAtendimento)
+class MetricaAtendimentoAdmin(admin.ModelAdmin):
+    list_display = (
+        "periodo",
+        "inicio",
+        "departamento",
+        "agente",
+        "atendimentos_abertos",
+        "atendimentos_finalizados",
+        "esperas",
+        "primeiras_respostas",
+    )
+    list_filter = ("periodo", "departamento")
+    date_hierarchy = "inicio"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LimitadorTaxa:
+    """
+    Token bucket thread-safe: ``taxa`` fichas por segundo, acumulando até
+    ``capacidade``. Taxa zero (ou negativa) desativa o limite.
+    """
+
+    def __init__(self, taxa: float, capacidade: float | None = None) -> None:
+        self.taxa = taxa
+        self.capacidade = capacidade if capacidade is not None else max(taxa, 1.0)
+        self.fichas = self.capacidade
+        self.atualizado = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reabastecer(self, agora: float) -> None:
+        self.fichas = min(
+            self.capacidade,
+            self.fichas + (agora - self.atualizado) * self.taxa,
+        )
+        self.atualizado = agora
+
+    def tentar(self) -> bool:
+        """Consome uma ficha se houver; não bloqueia."""
+        if self.taxa <= 0:
+            return True
+        with self.lock:
+            self._reabastecer(time.monotonic())
+            if self.fichas >= 1:
+                self.fichas -= 1
+                return True
+            return False
+
+    def aguardar(self) -> None:
+        """Bloqueia até haver uma ficha disponível e a consome."""
+        if self.taxa <= 0:
+            return
+        with self.lock:
+            self._reabastecer(time.monotonic())
+            self.fichas -= 1
+            espera = -self.fichas / self.taxa if self.fichas < 0 else 0.0
+        if espera > 0:
+            time.sleep(espera)
+
+
+class _EntradaPorChave:
+    __slots__ = ("limitador", "estado", "estado_em")
+
+    def __init__(self, limitador: LimitadorTaxa) -> None:
+        self.limitador = limitador
+        self.estado: object = None
+        self.estado_em = 0.0
+
+
+class LimitadorPorChave:
+    """
+    Um ``LimitadorTaxa`` por chave (ex: waid), criado sob demanda.
+
+    Cada chave também guarda um estado livre com validade (ver ``estado``).
+    Mantém no máximo ``max_chaves`` chaves em memória, descartando as usadas
+    há mais tempo.
+    """
+
+    def __init__(self, taxa: float, capacidade: float | None = None, max_chaves: int = 10000) -> None:
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.max_chaves = max_chaves
+        self.entradas: OrderedDict[str, _EntradaPorChave] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _entrada(self, chave: str) -> _EntradaPorChave:
+        # Chamado com self.lock adquirido
+        entrada = self.entradas.get(chave)
+        if entrada is None:
+            entrada = self.entradas[chave] = _EntradaPorChave(LimitadorTaxa(self.taxa, self.capacidade))
+            if len(self.entradas) > self.max_chaves:
+                self.entradas.popitem(last=False)
+        else:
+            self.entradas.move_to_end(chave)
+        return entrada
+
+    def tentar(self, chave: str) -> bool:
+        with self.lock:
+            limitador = self._entrada(chave).limitador
+        return limitador.tentar()
+
+    def estado(self, chave: str, validade: float) -> object:
+        """Estado guardado para ``chave`` há menos de ``validade`` segundos, ou ``None``."""
+        with self.lock:
+            entrada = self.entradas.get(chave)
+            if entrada is None or time.monotonic() - entrada.estado_em >= validade:
+                return None
+            return entrada.estado
+
+    def guardar_estado(self, chave: str, estado: object) -> None:
+        with self.lock:
+            entrada = self._entrada(chave)
+            entrada.estado = estado
+            entrada.estado_em = time.monotonic()
+
+    def esquecer_estado(self, chave: str) -> None:
+        with self.lock:
+            entrada = self.entradas.get(chave)
+            if entrada is not None:
+                entrada.estado = None
+                entrada.estado_em = 0.0
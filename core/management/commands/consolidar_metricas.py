@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import threading
+
+from django.core.management.base import BaseCommand
+
+from core.metricas import consolidar_metricas
+
+
+class Command(BaseCommand):
+    help = (
+        "Soma em MetricaAtendimento os eventos de SLA registrados pelos atendimentos "
+        "(EventoMetrica). Sem --intervalo, consolida o que estiver pendente e termina."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=None,
+            help="Continua rodando e consolida a cada N segundos.",
+        )
+
+    def handle(self, *args, **options):
+        intervalo = options["intervalo"]
+        parar = threading.Event()
+        try:
+            while True:
+                consolidados = consolidar_metricas()
+                if intervalo is None:
+                    self.stdout.write(self.style.SUCCESS(f"{consolidados} evento(s) consolidado(s)."))
+                    return
+                parar.wait(intervalo)
+        except KeyboardInterrupt:
+            self.stdout.write("Encerrando...")
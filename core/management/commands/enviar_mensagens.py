@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import logging
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import NumeroWhatsApp
+from core.services import enviar_proxima_mensagem
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Envia as mensagens enfileiradas para a API do WhatsApp. Cada número ativo "
+        "tem suas próprias threads (NumeroWhatsApp.workers), pool HTTP e limite de "
+        "envio, então um pico em um número não atrasa os demais."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--numero",
+            action="append",
+            default=[],
+            metavar="PHONE_NUMBER_ID",
+            help="Envia só pelos números informados (pode repetir); padrão: todos os ativos.",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=1.0,
+            help="Segundos entre consultas quando a fila está vazia (padrão: 1).",
+        )
+        parser.add_argument(
+            "--uma-vez",
+            action="store_true",
+            help="Esvazia as filas atuais e termina, em vez de ficar aguardando.",
+        )
+
+    def handle(self, *args, **options):
+        parar = threading.Event()
+        threads: dict[tuple[int, int], threading.Thread] = {}
+
+        def drenar(numero_id: int, fatia: int) -> None:
+            try:
+                while not parar.is_set():
+                    # Relido a cada rodada: mudanças no admin valem sem reiniciar.
+                    numero = NumeroWhatsApp.objects.filter(pk=numero_id, ativo=True).first()
+                    fatias = max(1, numero.workers) if numero is not None else 0
+                    if fatia >= fatias:
+                        return
+                    enviadas = 0
+                    while enviadas < 100 and enviar_proxima_mensagem(numero, fatia, fatias):
+                        enviadas += 1
+                    if not enviadas:
+                        if options["uma_vez"]:
+                            return
+                        parar.wait(options["intervalo"])
+            except Exception:  # noqa: BLE001
+                logger.exception("Envio: worker %s do número %s parou", fatia, numero_id)
+            finally:
+                connection.close()  # Conexão própria de cada thread
+
+        try:
+            while True:
+                numeros = NumeroWhatsApp.objects.filter(ativo=True)
+                if options["numero"]:
+                    numeros = numeros.filter(phone_number_id__in=options["numero"])
+                for numero in numeros:
+                    for fatia in range(max(1, numero.workers)):
+                        thread = threads.get((numero.pk, fatia))
+                        if thread is None or not thread.is_alive():
+                            thread = threading.Thread(
+                                target=drenar,
+                                args=(numero.pk, fatia),
+                                name=f"envio-{numero.phone_number_id}-{fatia}",
+                                daemon=True,
+                            )
+                            threads[(numero.pk, fatia)] = thread
+                            thread.start()
+                if options["uma_vez"]:
+                    break
+                # Threads que terminaram (número desativado, erro) são recriadas aqui.
+                parar.wait(max(options["intervalo"], 5.0))
+        except KeyboardInterrupt:
+            self.stdout.write("Encerrando...")
+        finally:
+            parar.set()
+            for thread in threads.values():
+                thread.join()
+            connection.close()
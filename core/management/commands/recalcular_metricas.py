@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from core.metricas import recalcular_metricas
+from core.models import Atendimento, EventoMetrica, Mensagem, MetricaAtendimento
+
+
+def _travar_metricas() -> None:
+    """
+    Bloqueia escritas em MetricaAtendimento e EventoMetrica até o fim da transação.
+
+    ``Atendimento.save()`` grava o atendimento e seus eventos na mesma transação:
+    saves já confirmados entram na reconstrução (e seus eventos pendentes são
+    descartados), e os concorrentes esperam o lock e registram eventos por cima
+    do resultado, sem perda nem contagem dupla.
+    """
+    if connection.vendor != "postgresql":
+        return
+    tabelas = ", ".join(
+        connection.ops.quote_name(modelo._meta.db_table)
+        for modelo in (MetricaAtendimento, EventoMetrica)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {tabelas} IN EXCLUSIVE MODE")
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói as métricas de SLA (MetricaAtendimento) a partir do histórico "
+        "de atendimentos, preenchendo antes a primeira resposta que faltar. "
+        "No Postgres a tabela de métricas fica bloqueada para escrita durante a "
+        "reconstrução; em outros bancos, rode com o webhook parado."
+    )
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+
+        # Primeira mensagem de agente (não automática) após a abertura do atendimento
+        primeira_resposta = (
+            Mensagem.objects.filter(
+                contato=OuterRef("contato"),
+                direcao=Mensagem.Direcao.SAIDA,
+                automatica=False,
+                timestamp__gte=OuterRef("data_inicio"),
+            )
+            .exclude(status=Mensagem.Status.FALHA)
+            .order_by("timestamp")
+            .values("timestamp")[:1]
+        )
+        sem_resposta = (
+            Atendimento.objects.filter(data_primeira_resposta__isnull=True)
+            .annotate(primeira=Subquery(primeira_resposta))
+            .filter(primeira__isnull=False)
+            .only("id")
+        )
+        preenchidos = []
+        for atendimento in sem_resposta.iterator(chunk_size=2000):
+            atendimento.data_primeira_resposta = atendimento.primeira
+            preenchidos.append(atendimento)
+        # bulk_update não passa pelo save(), então as métricas não são duplicadas
+        Atendimento.objects.bulk_update(preenchidos, ["data_primeira_resposta"], batch_size=1000)
+        self.stdout.write(f"Primeira resposta preenchida em {len(preenchidos)} atendimento(s).")
+
+        atendimentos = Atendimento.objects.only(
+            "data_inicio",
+            "data_em_atendimento",
+            "data_finalizacao",
+            "data_primeira_resposta",
+            "departamento",
+            "agente_responsavel_id",
+        ).iterator(chunk_size=2000)
+        with transaction.atomic():
+            _travar_metricas()
+            EventoMetrica.objects.all().delete()
+            MetricaAtendimento.objects.all().delete()
+            linhas = recalcular_metricas(atendimentos)
+
+        duracao = time.monotonic() - inicio
+        self.stdout.write(
+            self.style.SUCCESS(f"{linhas} linha(s) de métricas recalculadas em {duracao:.1f}s.")
+        )
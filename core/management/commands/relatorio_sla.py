@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.metricas import consolidar_metricas, relatorio_sla
+from core.models import MetricaAtendimento
+
+_AGRUPAMENTOS = ("departamento", "agente", "inicio")
+
+_COLUNAS = (
+    ("atendimentos_abertos", "Abertos"),
+    ("atendimentos_finalizados", "Finalizados"),
+    ("espera_media_segundos", "Espera média (s)"),
+    ("primeira_resposta_media_segundos", "1ª resposta média (s)"),
+)
+
+
+def _data(valor: str) -> date:
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f"Data inválida: {valor!r} (use AAAA-MM-DD).") from None
+
+
+class Command(BaseCommand):
+    help = (
+        "Relatório de SLA (volume, espera na fila e primeira resposta) lido das "
+        "métricas consolidadas. Consolida os eventos pendentes antes de ler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--de", help="Primeiro dia, AAAA-MM-DD (padrão: 7 dias atrás).")
+        parser.add_argument("--ate", help="Último dia, inclusive, AAAA-MM-DD (padrão: hoje).")
+        parser.add_argument(
+            "--por",
+            default="departamento",
+            help=f"Agrupamento separado por vírgula: {', '.join(_AGRUPAMENTOS)} (padrão: departamento).",
+        )
+        parser.add_argument(
+            "--periodo",
+            choices=[periodo.lower() for periodo in MetricaAtendimento.Periodo.values],
+            default="dia",
+            help="Granularidade das métricas lidas (padrão: dia).",
+        )
+
+    def handle(self, *args, **options):
+        hoje = timezone.localdate()
+        ate = _data(options["ate"]) if options["ate"] else hoje
+        de = _data(options["de"]) if options["de"] else ate - timedelta(days=7)
+        if de > ate:
+            raise CommandError("--de deve ser anterior ou igual a --ate.")
+        por = tuple(campo.strip() for campo in options["por"].split(",") if campo.strip())
+        invalidos = set(por) - set(_AGRUPAMENTOS)
+        if not por or invalidos:
+            raise CommandError(f"--por aceita apenas: {', '.join(_AGRUPAMENTOS)}.")
+
+        consolidar_metricas()
+        tz = timezone.get_current_timezone()
+        linhas = relatorio_sla(
+            datetime.combine(de, time.min, tzinfo=tz),
+            datetime.combine(ate + timedelta(days=1), time.min, tzinfo=tz),
+            periodo=options["periodo"].upper(),
+            por=por,
+        )
+
+        campos = [*por, *(campo for campo, _ in _COLUNAS)]
+        cabecalho = [*por, *(titulo for _, titulo in _COLUNAS)]
+        tabela = [[self._formatar(linha[campo]) for campo in campos] for linha in linhas]
+        larguras = [max(len(celula) for celula in coluna) for coluna in zip(cabecalho, *tabela)]
+        for linha in [cabecalho, *tabela]:
+            self.stdout.write("  ".join(celula.ljust(largura) for celula, largura in zip(linha, larguras)))
+        if not tabela:
+            self.stdout.write(f"Nenhuma métrica entre {de} e {ate}.")
+
+    @staticmethod
+    def _formatar(valor) -> str:
+        if valor is None:
+            return "-"
+        if isinstance(valor, float):
+            return f"{valor:.0f}"
+        if isinstance(valor, datetime):
+            return timezone.localtime(valor).strftime("%Y-%m-%d %H:%M")
+        return str(valor)
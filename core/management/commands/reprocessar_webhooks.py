@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.limites import LimitadorTaxa
+from core.models import FalhaWebhook
+from core.services import importar_spool_falhas, reprocessar_falha_webhook
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa o spool de falhas do webhook e reprocessa em lote os payloads "
+        "guardados na fila de mensagens mortas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Número de threads de reprocessamento (padrão: 8).",
+        )
+        parser.add_argument(
+            "--taxa",
+            type=float,
+            default=200.0,
+            help="Máximo de payloads por segundo; 0 desativa o limite (padrão: 200).",
+        )
+        parser.add_argument(
+            "--limite",
+            type=int,
+            default=None,
+            help="Reprocessa no máximo N payloads pendentes.",
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        limitador = LimitadorTaxa(options["taxa"])
+
+        importados = importar_spool_falhas()
+        if importados:
+            self.stdout.write(f"{importados} payload(s) importado(s) do spool de falhas.")
+
+        pendentes = (
+            FalhaWebhook.objects.filter(status=FalhaWebhook.Status.PENDENTE)
+            .order_by("criado_em", "id")
+            .values_list("id", flat=True)
+        )
+        if options["limite"] is not None:
+            pendentes = pendentes[: options["limite"]]
+        ids = list(pendentes)
+
+        if not ids:
+            self.stdout.write("Nenhum payload pendente.")
+            return
+
+        self.stdout.write(f"Reprocessando {len(ids)} payload(s) com {workers} worker(s)...")
+
+        def reprocessar(lote: list[int]) -> tuple[int, int]:
+            sucesso = falha = 0
+            try:
+                for falha_id in lote:
+                    limitador.aguardar()
+                    if reprocessar_falha_webhook(falha_id):
+                        sucesso += 1
+                    else:
+                        falha += 1
+            finally:
+                connection.close()  # Conexão própria de cada thread
+            return sucesso, falha
+
+        # Cada worker recebe uma fatia intercalada dos ids pendentes.
+        lotes = [ids[i::workers] for i in range(workers)]
+        sucesso = falha = 0
+        inicio = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for lote_sucesso, lote_falha in executor.map(reprocessar, lotes):
+                sucesso += lote_sucesso
+                falha += lote_falha
+
+        duracao = time.monotonic() - inicio
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Concluído em {duracao:.1f}s: {sucesso} reprocessado(s), {falha} com erro."
+            )
+        )
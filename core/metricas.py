@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Atendimento, EventoMetrica, MetricaAtendimento
+
+CAMPOS_METRICA = (
+    "atendimentos_abertos",
+    "atendimentos_finalizados",
+    "esperas",
+    "espera_total_segundos",
+    "primeiras_respostas",
+    "primeira_resposta_total_segundos",
+)
+
+
+def inicio_periodo(momento: datetime, periodo: str) -> datetime:
+    """Trunca ``momento`` para o início da hora ou do dia (horário local)."""
+    local = timezone.localtime(momento).replace(minute=0, second=0, microsecond=0)
+    if periodo == MetricaAtendimento.Periodo.DIA:
+        local = local.replace(hour=0)
+    return local
+
+
+def _segundos(inicio: datetime, fim: datetime) -> int:
+    return max(0, int((fim - inicio).total_seconds()))
+
+
+def eventos_atendimento(
+    atendimento: Atendimento,
+    *,
+    aberto: bool = False,
+    saiu_da_fila: bool = False,
+    finalizado: bool = False,
+    respondeu: bool = False,
+) -> list[tuple[datetime, dict[str, int]]]:
+    """Converte as transições de um atendimento em incrementos datados."""
+    eventos = []
+    if aberto:
+        eventos.append((atendimento.data_inicio, {"atendimentos_abertos": 1}))
+    if saiu_da_fila:
+        # Primeira saída da fila, seja para atendimento ou direto para finalizado
+        saidas = [d for d in (atendimento.data_em_atendimento, atendimento.data_finalizacao) if d]
+        if saidas:
+            saida = min(saidas)
+            eventos.append(
+                (
+                    saida,
+                    {
+                        "esperas": 1,
+                        "espera_total_segundos": _segundos(atendimento.data_inicio, saida),
+                    },
+                )
+            )
+    if finalizado and atendimento.data_finalizacao is not None:
+        eventos.append((atendimento.data_finalizacao, {"atendimentos_finalizados": 1}))
+    if respondeu and atendimento.data_primeira_resposta is not None:
+        eventos.append(
+            (
+                atendimento.data_primeira_resposta,
+                {
+                    "primeiras_respostas": 1,
+                    "primeira_resposta_total_segundos": _segundos(
+                        atendimento.data_inicio, atendimento.data_primeira_resposta
+                    ),
+                },
+            )
+        )
+    return eventos
+
+
+def _incrementar(chave: dict, deltas: dict[str, int]) -> None:
+    """
+    Soma ``deltas`` na linha de rollup identificada por ``chave`` (UPDATE atômico).
+
+    Deltas negativos (eventos movidos) nunca deixam um contador abaixo de zero
+    nem criam linhas novas.
+    """
+    incrementos = {
+        campo: F(campo) + valor if valor >= 0 else Greatest(F(campo) + valor, Value(0))
+        for campo, valor in deltas.items()
+    }
+    if MetricaAtendimento.objects.filter(**chave).update(**incrementos):
+        return
+    if all(valor < 0 for valor in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            MetricaAtendimento.objects.create(
+                **chave,
+                **{campo: max(valor, 0) for campo, valor in deltas.items()},
+            )
+    except IntegrityError:
+        # Outro consolidador criou a linha entre o UPDATE e o INSERT
+        MetricaAtendimento.objects.filter(**chave).update(**incrementos)
+
+
+def _registrar(eventos: list[EventoMetrica]) -> None:
+    if eventos:
+        EventoMetrica.objects.bulk_create(eventos)
+
+
+def registrar_eventos_atendimento(atendimento: Atendimento, **transicoes: bool) -> None:
+    """Registra as transições de um atendimento recém-salvo como eventos."""
+    _registrar(
+        [
+            EventoMetrica(
+                momento=momento,
+                departamento=atendimento.departamento,
+                agente_id=atendimento.agente_responsavel_id,
+                **deltas,
+            )
+            for momento, deltas in eventos_atendimento(atendimento, **transicoes)
+        ]
+    )
+
+
+def mover_eventos_atendimento(
+    atendimento: Atendimento,
+    *,
+    de: tuple[str, Optional[int]],
+    **transicoes: bool,
+) -> None:
+    """
+    Move os eventos já contados de um atendimento do par (departamento, agente)
+    ``de`` para o departamento e agente atuais.
+    """
+    departamento_anterior, agente_anterior = de
+    eventos = []
+    for momento, deltas in eventos_atendimento(atendimento, aberto=True, **transicoes):
+        eventos.append(
+            EventoMetrica(
+                momento=momento,
+                departamento=departamento_anterior,
+                agente_id=agente_anterior,
+                **{campo: -valor for campo, valor in deltas.items()},
+            )
+        )
+        eventos.append(
+            EventoMetrica(
+                momento=momento,
+                departamento=atendimento.departamento,
+                agente_id=atendimento.agente_responsavel_id,
+                **deltas,
+            )
+        )
+    _registrar(eventos)
+
+
+def consolidar_metricas(lote: int = 5000) -> int:
+    """
+    Soma os eventos pendentes em ``MetricaAtendimento`` e os apaga.
+
+    Cada lote é somado em memória e aplicado com um UPDATE por linha de rollup,
+    na mesma transação que apaga os eventos. Os eventos ficam travados com
+    ``SKIP LOCKED``, então consolidadores concorrentes nunca somam o mesmo
+    evento duas vezes. Retorna quantos eventos foram consolidados.
+    """
+    total = 0
+    while True:
+        with transaction.atomic():
+            eventos = list(
+                EventoMetrica.objects.select_for_update(skip_locked=True).order_by("id")[:lote]
+            )
+            if not eventos:
+                return total
+            acumulado: dict[tuple, dict[str, int]] = {}
+            for evento in eventos:
+                for periodo in MetricaAtendimento.Periodo.values:
+                    chave = (
+                        periodo,
+                        inicio_periodo(evento.momento, periodo),
+                        evento.departamento,
+                        evento.agente_id,
+                    )
+                    linha = acumulado.setdefault(chave, dict.fromkeys(CAMPOS_METRICA, 0))
+                    for campo in CAMPOS_METRICA:
+                        linha[campo] += getattr(evento, campo)
+            for (periodo, inicio, departamento, agente_id), deltas in acumulado.items():
+                deltas = {campo: valor for campo, valor in deltas.items() if valor}
+                if deltas:
+                    _incrementar(
+                        {
+                            "periodo": periodo,
+                            "inicio": inicio,
+                            "departamento": departamento,
+                            "agente_id": agente_id,
+                        },
+                        deltas,
+                    )
+            EventoMetrica.objects.filter(pk__in=[evento.pk for evento in eventos]).delete()
+        total += len(eventos)
+
+
+def recalcular_metricas(atendimentos: Iterable[Atendimento]) -> int:
+    """
+    Recalcula as métricas a partir dos carimbos de data dos atendimentos.
+
+    Acumula tudo em memória e grava com ``bulk_create``; as linhas existentes
+    devem ser removidas antes pelo chamador. Retorna o número de linhas criadas.
+
+    Usa a mesma regra das atualizações incrementais: todos os eventos são
+    creditados ao departamento e agente atuais do atendimento.
+    """
+    acumulado: dict[tuple, dict[str, int]] = {}
+    for atendimento in atendimentos:
+        eventos = eventos_atendimento(
+            atendimento,
+            aberto=True,
+            saiu_da_fila=True,
+            finalizado=True,
+            respondeu=True,
+        )
+        for momento, deltas in eventos:
+            for periodo in MetricaAtendimento.Periodo.values:
+                chave = (
+                    periodo,
+                    inicio_periodo(momento, periodo),
+                    atendimento.departamento,
+                    atendimento.agente_responsavel_id,
+                )
+                linha = acumulado.setdefault(chave, dict.fromkeys(CAMPOS_METRICA, 0))
+                for campo, valor in deltas.items():
+                    linha[campo] += valor
+
+    MetricaAtendimento.objects.bulk_create(
+        [
+            MetricaAtendimento(
+                periodo=periodo,
+                inicio=inicio,
+                departamento=departamento,
+                agente_id=agente_id,
+                **valores,
+            )
+            for (periodo, inicio, departamento, agente_id), valores in acumulado.items()
+        ],
+        batch_size=1000,
+    )
+    return len(acumulado)
+
+
+def relatorio_sla(
+    inicio: datetime,
+    fim: datetime,
+    *,
+    periodo: str = MetricaAtendimento.Periodo.DIA,
+    por: Iterable[str] = ("departamento",),
+) -> list[dict]:
+    """
+    Relatório de SLA entre ``inicio`` e ``fim`` lido apenas das métricas.
+
+    Eventos ainda não consolidados ficam de fora; chame ``consolidar_metricas``
+    antes para um relatório em dia.
+
+    ``por`` define o agrupamento (ex: ``("departamento", "agente")``). Cada linha
+    traz os totais e as médias de espera e de primeira resposta em segundos.
+    """
+    linhas = (
+        MetricaAtendimento.objects.filter(periodo=periodo, inicio__gte=inicio, inicio__lt=fim)
+        .values(*por)
+        .annotate(**{campo: Sum(campo) for campo in CAMPOS_METRICA})
+        .order_by(*por)
+    )
+    resultado = []
+    for linha in linhas:
+        linha["espera_media_segundos"] = (
+            linha["espera_total_segundos"] / linha["esperas"] if linha["esperas"] else None
+        )
+        linha["primeira_resposta_media_segundos"] = (
+            linha["primeira_resposta_total_segundos"] / linha["primeiras_respostas"]
+            if linha["primeiras_respostas"]
+            else None
+        )
+        resultado.append(linha)
+    return resultado
@@ -0,0 +1,18 @@
+# Generated migration for Contato.atualizado_em index
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_cliente_atendimento"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="contato",
+            name="atualizado_em",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
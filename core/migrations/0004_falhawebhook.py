@@ -0,0 +1,37 @@
+# Generated migration for FalhaWebhook (dead-letter do webhook)
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_contato_atualizado_em_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FalhaWebhook",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("fingerprint", models.CharField(help_text="SHA-256 do payload canônico", max_length=64, unique=True)),
+                ("payload", models.JSONField()),
+                ("erro", models.TextField(blank=True)),
+                ("status", models.CharField(choices=[("PENDENTE", "Pendente"), ("REPROCESSADO", "Reprocessado")], db_index=True, default="PENDENTE", max_length=20)),
+                ("tentativas", models.PositiveIntegerField(default=1)),
+                ("criado_em", models.DateTimeField(auto_now_add=True)),
+                ("atualizado_em", models.DateTimeField(auto_now=True)),
+                ("reprocessado_em", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Falha de webhook",
+                "verbose_name_plural": "Falhas de webhook",
+                "ordering": ("criado_em", "id"),
+            },
+        ),
+        migrations.AlterField(
+            model_name="mensagem",
+            name="meta_message_id",
+            field=models.CharField(blank=True, db_index=True, help_text="ID da mensagem na API do WhatsApp (Meta)", max_length=128),
+        ),
+    ]
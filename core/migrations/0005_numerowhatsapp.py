@@ -0,0 +1,59 @@
+# Generated migration for NumeroWhatsApp (múltiplos números)
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def cadastrar_numero_padrao(apps, schema_editor):
+    """Migra o número configurado via settings/.env para o banco."""
+    if not settings.META_WA_PHONE_NUMBER_ID:
+        return
+    NumeroWhatsApp = apps.get_model("core", "NumeroWhatsApp")
+    numero, _ = NumeroWhatsApp.objects.get_or_create(
+        phone_number_id=settings.META_WA_PHONE_NUMBER_ID,
+        defaults={
+            "nome": "Principal",
+            "access_token": settings.META_WA_ACCESS_TOKEN,
+        },
+    )
+    apps.get_model("core", "Contato").objects.filter(numero__isnull=True).update(numero=numero)
+    apps.get_model("core", "Mensagem").objects.filter(numero__isnull=True).update(numero=numero)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_falhawebhook"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NumeroWhatsApp",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("nome", models.CharField(max_length=255)),
+                ("phone_number_id", models.CharField(help_text="ID do número na API do WhatsApp (Meta)", max_length=64, unique=True, verbose_name="Phone number ID")),
+                ("access_token", models.TextField()),
+                ("mensagens_por_segundo", models.PositiveIntegerField(default=20, help_text="Limite de envios por segundo deste número")),
+                ("workers", models.PositiveSmallIntegerField(default=4, help_text="Threads de processamento e conexões HTTP dedicadas a este número")),
+                ("ativo", models.BooleanField(default=True)),
+            ],
+            options={
+                "verbose_name": "Número do WhatsApp",
+                "verbose_name_plural": "Números do WhatsApp",
+                "ordering": ("nome",),
+            },
+        ),
+        migrations.AddField(
+            model_name="contato",
+            name="numero",
+            field=models.ForeignKey(blank=True, help_text="Número pelo qual o contato falou por último", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="contatos", to="core.numerowhatsapp"),
+        ),
+        migrations.AddField(
+            model_name="mensagem",
+            name="numero",
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="mensagens", to="core.numerowhatsapp"),
+        ),
+        migrations.RunPython(cadastrar_numero_padrao, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated migration for métricas de SLA (MetricaAtendimento)
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def marcar_mensagens_automaticas(apps, schema_editor):
+    """Marca as respostas do robô já enviadas (menu e aviso de fila)."""
+    Mensagem = apps.get_model("core", "Mensagem")
+    Mensagem.objects.filter(direcao="out").filter(
+        models.Q(texto__startswith="Olá! Escolha o departamento:")
+        | models.Q(texto__startswith="Você está na fila do ")
+    ).update(automatica=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_numerowhatsapp"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="atendimento",
+            name="data_em_atendimento",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="atendimento",
+            name="data_finalizacao",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="atendimento",
+            name="data_primeira_resposta",
+            field=models.DateTimeField(blank=True, help_text="Primeira mensagem enviada por um agente (respostas automáticas não contam)", null=True),
+        ),
+        migrations.AddField(
+            model_name="mensagem",
+            name="automatica",
+            field=models.BooleanField(default=False, help_text="Resposta automática do robô (menu, fila)"),
+        ),
+        migrations.CreateModel(
+            name="MetricaAtendimento",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("periodo", models.CharField(choices=[("HORA", "Hora"), ("DIA", "Dia")], max_length=4)),
+                ("inicio", models.DateTimeField(help_text="Início do período (horário local)")),
+                ("departamento", models.CharField(choices=[("COMERCIAL", "Comercial"), ("FINANCEIRO", "Financeiro"), ("TECNICO", "Técnico"), ("SEM_DEPARTAMENTO", "Sem departamento")], max_length=20)),
+                ("atendimentos_abertos", models.PositiveIntegerField(default=0)),
+                ("atendimentos_finalizados", models.PositiveIntegerField(default=0)),
+                ("esperas", models.PositiveIntegerField(default=0)),
+                ("espera_total_segundos", models.BigIntegerField(default=0)),
+                ("primeiras_respostas", models.PositiveIntegerField(default=0)),
+                ("primeira_resposta_total_segundos", models.BigIntegerField(default=0)),
+                ("agente", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name="metricas_atendimento", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "verbose_name": "Métrica de atendimento",
+                "verbose_name_plural": "Métricas de atendimento",
+                "ordering": ("-inicio", "departamento"),
+                "indexes": [models.Index(fields=["periodo", "inicio"], name="metrica_periodo_inicio_idx")],
+                "constraints": [models.UniqueConstraint(fields=("periodo", "inicio", "departamento", "agente"), name="metrica_atendimento_unica", nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(marcar_mensagens_automaticas, migrations.RunPython.noop),
+    ]
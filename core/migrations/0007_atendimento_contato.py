@@ -0,0 +1,48 @@
+# Generated migration: Atendimento passa a apontar para Contato (unificação com Cliente)
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def unificar_clientes(apps, schema_editor):
+    """
+    Associa cada atendimento ao contato com o mesmo waid do telefone do cliente,
+    criando o contato quando ele ainda não existe. O nome do cliente prevalece
+    quando o contato só tem o waid como nome.
+    """
+    Atendimento = apps.get_model("core", "Atendimento")
+    Cliente = apps.get_model("core", "Cliente")
+    Contato = apps.get_model("core", "Contato")
+
+    for cliente in Cliente.objects.iterator():
+        contato, created = Contato.objects.get_or_create(
+            waid=cliente.telefone,
+            defaults={"nome": cliente.nome or cliente.telefone},
+        )
+        if not created and cliente.nome and contato.nome == contato.waid:
+            contato.nome = cliente.nome
+            contato.save(update_fields=["nome"])
+        Atendimento.objects.filter(cliente=cliente).update(contato=contato)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_metricas_sla"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="atendimento",
+            name="contato",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="atendimentos",
+                to="core.contato",
+            ),
+        ),
+        # O caminho inverso (recriar os clientes) fica na 0008, antes de
+        # cliente voltar a ser obrigatório.
+        migrations.RunPython(unificar_clientes, migrations.RunPython.noop),
+    ]
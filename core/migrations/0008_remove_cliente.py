@@ -0,0 +1,64 @@
+# Generated migration: remove Cliente (unificado em Contato)
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def separar_clientes(apps, schema_editor):
+    """Recria um cliente por contato e reassocia os atendimentos (reversão)."""
+    Atendimento = apps.get_model("core", "Atendimento")
+    Cliente = apps.get_model("core", "Cliente")
+    Contato = apps.get_model("core", "Contato")
+
+    contatos = Contato.objects.filter(
+        pk__in=Atendimento.objects.values("contato_id"),
+    )
+    for contato in contatos.iterator():
+        cliente, _ = Cliente.objects.get_or_create(
+            telefone=contato.waid,
+            defaults={"nome": contato.nome},
+        )
+        Atendimento.objects.filter(contato=contato).update(cliente=cliente)
+
+
+class Migration(migrations.Migration):
+
+    # Na reversão, cliente volta como opcional, é preenchido por
+    # separar_clientes e só então fica obrigatório. No Postgres, o ALTER TABLE
+    # não pode rodar na mesma transação que atualizou as linhas (as FKs são
+    # DEFERRABLE), então cada operação roda na sua própria transação.
+    atomic = False
+
+    dependencies = [
+        ("core", "0007_atendimento_contato"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="atendimento",
+            name="cliente",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="atendimentos",
+                to="core.cliente",
+            ),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, separar_clientes),
+        migrations.RemoveField(
+            model_name="atendimento",
+            name="cliente",
+        ),
+        migrations.AlterField(
+            model_name="atendimento",
+            name="contato",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="atendimentos",
+                to="core.contato",
+            ),
+        ),
+        migrations.DeleteModel(
+            name="Cliente",
+        ),
+    ]
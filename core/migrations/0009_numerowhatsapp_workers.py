@@ -0,0 +1,18 @@
+# Generated migration for NumeroWhatsApp.workers (help_text)
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_remove_cliente"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="numerowhatsapp",
+            name="workers",
+            field=models.PositiveSmallIntegerField(default=4, help_text="Conexões HTTP simultâneas dedicadas a este número"),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated migration: MetricaAtendimento.agente sem FK no banco
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_numerowhatsapp_workers"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="metricaatendimento",
+            name="agente",
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name="metricas_atendimento", to=settings.AUTH_USER_MODEL),
+        ),
+    ]
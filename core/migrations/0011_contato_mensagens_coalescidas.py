@@ -0,0 +1,18 @@
+# Generated migration for Contato.mensagens_coalescidas
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_metrica_agente_sem_fk"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contato",
+            name="mensagens_coalescidas",
+            field=models.PositiveIntegerField(default=0, help_text="Mensagens gravadas sem roteamento pelo controle de flood"),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated migration for the outbound queue (Mensagem enfileirada por número)
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_contato_mensagens_coalescidas"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="numerowhatsapp",
+            name="workers",
+            field=models.PositiveSmallIntegerField(
+                default=4,
+                help_text="Threads do comando enviar_mensagens (e conexões HTTP) dedicadas a este número",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="mensagem",
+            index=models.Index(
+                condition=models.Q(("direcao", "out"), ("status", "queued")),
+                fields=["numero", "id"],
+                name="mensagem_fila_envio_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated migration for EventoMetrica (eventos de SLA pendentes de consolidação)
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_fila_envio"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventoMetrica",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("momento", models.DateTimeField()),
+                ("departamento", models.CharField(choices=[("COMERCIAL", "Comercial"), ("FINANCEIRO", "Financeiro"), ("TECNICO", "Técnico"), ("SEM_DEPARTAMENTO", "Sem departamento")], max_length=20)),
+                ("atendimentos_abertos", models.IntegerField(default=0)),
+                ("atendimentos_finalizados", models.IntegerField(default=0)),
+                ("esperas", models.IntegerField(default=0)),
+                ("espera_total_segundos", models.BigIntegerField(default=0)),
+                ("primeiras_respostas", models.IntegerField(default=0)),
+                ("primeira_resposta_total_segundos", models.BigIntegerField(default=0)),
+                ("agente", models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name="+", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "verbose_name": "Evento de métrica",
+                "verbose_name_plural": "Eventos de métrica",
+            },
+        ),
+    ]
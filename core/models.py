@@ -1,21 +1,74 @@
 from __future__ import annotations
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 
-class Cliente(models.Model):
-    """Cliente identificado pelo telefone (ex: 551199999999)."""
-    telefone = models.CharField(max_length=32, unique=True)
-    nome = models.CharField(max_length=255, blank=True)
+class NumeroWhatsApp(models.Model):
+    """Número do WhatsApp Business (ex: vendas, suporte técnico) e suas credenciais."""
+    nome = models.CharField(max_length=255)
+    phone_number_id = models.CharField(
+        "Phone number ID",
+        max_length=64,
+        unique=True,
+        help_text="ID do número na API do WhatsApp (Meta)",
+    )
+    access_token = models.TextField()
+    mensagens_por_segundo = models.PositiveIntegerField(
+        default=20,
+        help_text="Limite de envios por segundo deste número",
+    )
+    workers = models.PositiveSmallIntegerField(
+        default=4,
+        help_text=(
+            "Threads do comando enviar_mensagens (e conexões HTTP) dedicadas "
+            "a este número"
+        ),
+    )
+    ativo = models.BooleanField(default=True)
 
     class Meta:
-        verbose_name = "Cliente"
-        verbose_name_plural = "Clientes"
-        ordering = ("nome", "telefone")
+        verbose_name = "Número do WhatsApp"
+        verbose_name_plural = "Números do WhatsApp"
+        ordering = ("nome",)
 
     def __str__(self) -> str:
-        return f"{self.nome or self.telefone} ({self.telefone})"
+        return f"{self.nome} ({self.phone_number_id})"
+
+
+class Contato(models.Model):
+    """Pessoa que fala com a empresa, identificada pelo waid (ex: 551199999999)."""
+    nome = models.CharField(max_length=255)
+    waid = models.CharField("WAID", max_length=32, unique=True)
+    ultima_mensagem = models.TextField(blank=True)
+    numero = models.ForeignKey(
+        NumeroWhatsApp,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="contatos",
+        help_text="Número pelo qual o contato falou por último",
+    )
+    mensagens_coalescidas = models.PositiveIntegerField(
+        default=0,
+        help_text="Mensagens gravadas sem roteamento pelo controle de flood",
+    )
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Contato"
+        verbose_name_plural = "Contatos"
+        ordering = ("-atualizado_em",)
+
+    def __str__(self) -> str:
+        return f"{self.nome} ({self.waid})"
+
+    @property
+    def telefone(self) -> str:
+        """Compatibilidade com o antigo ``Cliente.telefone``."""
+        return self.waid
 
 
 class Atendimento(models.Model):
@@ -30,8 +83,8 @@ class Atendimento(models.Model):
         EM_ATENDIMENTO = "EM_ATENDIMENTO", "Em atendimento"
         FINALIZADO = "FINALIZADO", "Finalizado"
 
-    cliente = models.ForeignKey(
-        Cliente,
+    contato = models.ForeignKey(
+        Contato,
         on_delete=models.CASCADE,
         related_name="atendimentos",
     )
@@ -46,6 +99,13 @@ class Atendimento(models.Model):
         default=Status.AGUARDANDO,
     )
     data_inicio = models.DateTimeField(auto_now_add=True)
+    data_em_atendimento = models.DateTimeField(null=True, blank=True)
+    data_finalizacao = models.DateTimeField(null=True, blank=True)
+    data_primeira_resposta = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Primeira mensagem enviada por um agente (respostas automáticas não contam)",
+    )
     agente_responsavel = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -60,23 +120,80 @@ class Atendimento(models.Model):
         ordering = ("-data_inicio",)
 
     def __str__(self) -> str:
-        return f"#{self.pk} {self.cliente} - {self.get_departamento_display()} ({self.get_status_display()})"
+        return f"#{self.pk} {self.contato} - {self.get_departamento_display()} ({self.get_status_display()})"
 
+    @property
+    def cliente(self) -> Contato:
+        """Compatibilidade com o antigo modelo ``Cliente`` (unificado em ``Contato``)."""
+        return self.contato
 
-class Contato(models.Model):
-    nome = models.CharField(max_length=255)
-    waid = models.CharField("WAID", max_length=32, unique=True)
-    ultima_mensagem = models.TextField(blank=True)
-    atualizado_em = models.DateTimeField(auto_now=True)
-    criado_em = models.DateTimeField(auto_now_add=True)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._status_original = instance.__dict__.get("status")
+        instance._primeira_resposta_original = instance.__dict__.get("data_primeira_resposta")
+        instance._chave_metricas_original = (
+            (instance.departamento, instance.agente_responsavel_id)
+            if {"departamento", "agente_responsavel_id"} <= instance.__dict__.keys()
+            else None
+        )
+        return instance
 
-    class Meta:
-        verbose_name = "Contato"
-        verbose_name_plural = "Contatos"
-        ordering = ("-atualizado_em",)
+    def save(self, *args, **kwargs):
+        """
+        Registra o horário das transições de status e os eventos de SLA
+        (``EventoMetrica``), somados depois em ``MetricaAtendimento``.
 
-    def __str__(self) -> str:
-        return f"{self.nome} ({self.waid})"
+        Todos os eventos de um atendimento são creditados ao departamento e ao
+        agente atuais; quando um deles muda, o que já foi contado é movido.
+        """
+        from .metricas import mover_eventos_atendimento, registrar_eventos_atendimento
+
+        novo = self._state.adding
+        status_anterior = getattr(self, "_status_original", None)
+        # Eventos já refletidos nas métricas antes deste save
+        saiu_antes = self.data_em_atendimento is not None or self.data_finalizacao is not None
+        finalizado_antes = self.data_finalizacao is not None
+        respondeu_antes = getattr(self, "_primeira_resposta_original", None) is not None
+        chave_anterior = getattr(self, "_chave_metricas_original", None)
+
+        agora = timezone.now()
+        carimbados = []
+        if self.status != status_anterior:
+            if self.status == self.Status.EM_ATENDIMENTO and self.data_em_atendimento is None:
+                self.data_em_atendimento = agora
+                carimbados.append("data_em_atendimento")
+            if self.status == self.Status.FINALIZADO and self.data_finalizacao is None:
+                self.data_finalizacao = agora
+                carimbados.append("data_finalizacao")
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and carimbados:
+            kwargs["update_fields"] = list(update_fields) + carimbados
+
+        # Atendimento e eventos de métrica na mesma transação (ver recalcular_metricas)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            chave = (self.departamento, self.agente_responsavel_id)
+            if not novo and chave_anterior is not None and chave_anterior != chave:
+                mover_eventos_atendimento(
+                    self,
+                    de=chave_anterior,
+                    saiu_da_fila=saiu_antes,
+                    finalizado=finalizado_antes,
+                    respondeu=respondeu_antes,
+                )
+            registrar_eventos_atendimento(
+                self,
+                aberto=novo,
+                saiu_da_fila=not saiu_antes and bool(carimbados),
+                finalizado="data_finalizacao" in carimbados,
+                respondeu=self.data_primeira_resposta is not None and not respondeu_antes,
+            )
+        self._status_original = self.status
+        self._primeira_resposta_original = self.data_primeira_resposta
+        self._chave_metricas_original = (self.departamento, self.agente_responsavel_id)
 
 
 class Mensagem(models.Model):
@@ -96,6 +213,13 @@ class Mensagem(models.Model):
         on_delete=models.CASCADE,
         related_name="mensagens",
     )
+    numero = models.ForeignKey(
+        NumeroWhatsApp,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="mensagens",
+    )
     texto = models.TextField()
     direcao = models.CharField(
         max_length=3,
@@ -107,9 +231,14 @@ class Mensagem(models.Model):
         default=Status.ENFILEIRADA,
     )
     timestamp = models.DateTimeField(db_index=True)
+    automatica = models.BooleanField(
+        default=False,
+        help_text="Resposta automática do robô (menu, fila)",
+    )
     meta_message_id = models.CharField(
         max_length=128,
         blank=True,
+        db_index=True,
         help_text="ID da mensagem na API do WhatsApp (Meta)",
     )
     criado_em = models.DateTimeField(auto_now_add=True)
@@ -118,8 +247,138 @@ class Mensagem(models.Model):
         verbose_name = "Mensagem"
         verbose_name_plural = "Mensagens"
         ordering = ("timestamp", "id")
+        indexes = [
+            # Fila de envio por número (ver services.enviar_proxima_mensagem)
+            models.Index(
+                fields=("numero", "id"),
+                name="mensagem_fila_envio_idx",
+                condition=models.Q(status="queued", direcao="out"),
+            ),
+        ]
 
     def __str__(self) -> str:
         prefix = ">>" if self.direcao == self.Direcao.SAIDA else "<<"
         return f"{prefix} {self.contato}: {self.texto[:40]}"
 
+
+class FalhaWebhook(models.Model):
+    """Payload do webhook que falhou no processamento (fila de mensagens mortas)."""
+
+    class Status(models.TextChoices):
+        PENDENTE = "PENDENTE", "Pendente"
+        REPROCESSADO = "REPROCESSADO", "Reprocessado"
+
+    fingerprint = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="SHA-256 do payload canônico",
+    )
+    payload = models.JSONField()
+    erro = models.TextField(blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDENTE,
+        db_index=True,
+    )
+    tentativas = models.PositiveIntegerField(default=1)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+    reprocessado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Falha de webhook"
+        verbose_name_plural = "Falhas de webhook"
+        ordering = ("criado_em", "id")
+
+    def __str__(self) -> str:
+        return f"#{self.pk} {self.fingerprint[:12]} ({self.get_status_display()})"
+
+
+class MetricaAtendimento(models.Model):
+    """
+    Rollup incremental de SLA por período (hora/dia), departamento e agente.
+
+    Guarda somas e contagens; médias são calculadas na consulta.
+    """
+
+    class Periodo(models.TextChoices):
+        HORA = "HORA", "Hora"
+        DIA = "DIA", "Dia"
+
+    periodo = models.CharField(max_length=4, choices=Periodo.choices)
+    inicio = models.DateTimeField(help_text="Início do período (horário local)")
+    departamento = models.CharField(
+        max_length=20,
+        choices=Atendimento.Departamento.choices,
+    )
+    # Sem FK no banco: métricas não impedem remover usuários
+    agente = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="metricas_atendimento",
+    )
+    atendimentos_abertos = models.PositiveIntegerField(default=0)
+    atendimentos_finalizados = models.PositiveIntegerField(default=0)
+    esperas = models.PositiveIntegerField(default=0)
+    espera_total_segundos = models.BigIntegerField(default=0)
+    primeiras_respostas = models.PositiveIntegerField(default=0)
+    primeira_resposta_total_segundos = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Métrica de atendimento"
+        verbose_name_plural = "Métricas de atendimento"
+        ordering = ("-inicio", "departamento")
+        constraints = [
+            models.UniqueConstraint(
+                fields=("periodo", "inicio", "departamento", "agente"),
+                name="metrica_atendimento_unica",
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=("periodo", "inicio"), name="metrica_periodo_inicio_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_periodo_display()} {self.inicio:%Y-%m-%d %H:%M} {self.departamento} {self.agente_id or '-'}"
+
+
+class EventoMetrica(models.Model):
+    """
+    Incremento de SLA ainda não somado em ``MetricaAtendimento``.
+
+    ``Atendimento.save()`` só insere eventos, sem disputar as linhas de rollup
+    com outros contatos; ``metricas.consolidar_metricas`` soma e apaga os
+    eventos depois. Os campos podem ser negativos quando eventos são movidos.
+    """
+
+    momento = models.DateTimeField()
+    departamento = models.CharField(
+        max_length=20,
+        choices=Atendimento.Departamento.choices,
+    )
+    agente = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    atendimentos_abertos = models.IntegerField(default=0)
+    atendimentos_finalizados = models.IntegerField(default=0)
+    esperas = models.IntegerField(default=0)
+    espera_total_segundos = models.BigIntegerField(default=0)
+    primeiras_respostas = models.IntegerField(default=0)
+    primeira_resposta_total_segundos = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Evento de métrica"
+        verbose_name_plural = "Eventos de métrica"
+
+    def __str__(self) -> str:
+        return f"{self.momento:%Y-%m-%d %H:%M} {self.departamento} {self.agente_id or '-'}"
@@ -1,32 +1,266 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import partial
+from pathlib import Path
 from typing import Optional
 
 import requests
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Mod
 from django.utils import timezone
+from requests.adapters import HTTPAdapter
 
-from .models import Contato, Mensagem
+from .limites import LimitadorPorChave, LimitadorTaxa
+from .models import Atendimento, Contato, FalhaWebhook, Mensagem, NumeroWhatsApp
 
 logger = logging.getLogger(__name__)
 
 
-def enviar_mensagem_whatsapp(waid: str, texto: str) -> Mensagem:
+# Pool HTTP e limitador de cada número, refeitos quando o cadastro muda.
+_recursos: dict[str, tuple[tuple, requests.Session, LimitadorTaxa]] = {}
+_recursos_lock = threading.Lock()
+
+# Controle de flood por waid: bursts de mensagens são gravados, mas só disparam
+# o roteamento da fila dentro destes limites. Cada contato guarda o estado do
+# atendimento visto no último roteamento; dentro da janela, um comando só passa
+# se puder mudar esse estado (ex: "oi" sem atendimento aberto, departamento
+# ainda não escolhido). Janela zero desativa o controle.
+_JANELA_ROTEAMENTO = settings.WHATSAPP_ROTEAMENTO_JANELA_SEGUNDOS
+_COMANDOS_FILA = frozenset({"oi", "1", "2", "3"})
+_SEM_ATENDIMENTO = "sem_atendimento"
+_SEM_DEPARTAMENTO = "sem_departamento"
+_NA_FILA = "na_fila"
+_EM_ATENDIMENTO = "em_atendimento"
+_COMANDOS_POR_ESTADO = {
+    _SEM_ATENDIMENTO: frozenset({"oi"}),
+    _SEM_DEPARTAMENTO: frozenset({"1", "2", "3"}),
+    _NA_FILA: frozenset(),
+    _EM_ATENDIMENTO: frozenset(),
+}
+_roteamento_por_contato = LimitadorPorChave(
+    1.0 / _JANELA_ROTEAMENTO if _JANELA_ROTEAMENTO > 0 else 0,
+    capacidade=settings.WHATSAPP_ROTEAMENTO_RAJADA,
+)
+# Limite de respostas automáticas idênticas (mesmo texto) por contato
+_respostas_automaticas_por_contato = LimitadorPorChave(
+    settings.WHATSAPP_RESPOSTAS_AUTOMATICAS_POR_MINUTO / 60.0,
+    capacidade=settings.WHATSAPP_RESPOSTAS_AUTOMATICAS_POR_MINUTO,
+)
+
+
+def _recursos_do_numero(numero: NumeroWhatsApp) -> tuple[requests.Session, LimitadorTaxa]:
+    """
+    Pool HTTP e limitador de envio exclusivos de um número.
+
+    Ficam em memória enquanto o cadastro do número (limite e workers) não muda;
+    uma alteração no admin é aplicada na próxima mensagem enviada.
+    """
+    assinatura = (numero.pk, numero.mensagens_por_segundo, numero.workers)
+    with _recursos_lock:
+        recursos = _recursos.get(numero.phone_number_id)
+        if recursos is None or recursos[0] != assinatura:
+            sessao = requests.Session()
+            sessao.mount(
+                "https://",
+                HTTPAdapter(pool_connections=1, pool_maxsize=max(1, numero.workers)),
+            )
+            recursos = (assinatura, sessao, LimitadorTaxa(numero.mensagens_por_segundo))
+            _recursos[numero.phone_number_id] = recursos
+        return recursos[1], recursos[2]
+
+
+def _chave_contato(waid: str) -> int:
+    """Hash estável de 64 bits (com sinal) do waid, usado como chave de lock."""
+    digest = hashlib.blake2b(waid.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _travar_contato(waid: str) -> None:
+    """
+    Serializa o processamento do mesmo contato entre threads e processos com um
+    advisory lock do Postgres, liberado no fim da transação corrente.
     """
-    Envia uma mensagem de texto via API do WhatsApp (Meta) e registra no banco.
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [_chave_contato(waid)])
+
+
+def obter_numero_padrao() -> Optional[NumeroWhatsApp]:
     """
-    if not settings.META_WA_PHONE_NUMBER_ID or not settings.META_WA_ACCESS_TOKEN:
+    Número usado quando o contato ainda não tem um número ativo associado: o
+    primeiro número ativo cadastrado ou, na falta dele, o configurado via
+    settings (legado), que é cadastrado na hora.
+    """
+    numero = NumeroWhatsApp.objects.filter(ativo=True).order_by("id").first()
+    if numero is not None:
+        return numero
+    phone_number_id = settings.META_WA_PHONE_NUMBER_ID
+    if (
+        phone_number_id
+        and settings.META_WA_ACCESS_TOKEN
+        and not NumeroWhatsApp.objects.filter(phone_number_id=phone_number_id).exists()
+    ):
+        numero, _ = NumeroWhatsApp.objects.get_or_create(
+            phone_number_id=phone_number_id,
+            defaults={"nome": "Padrão", "access_token": settings.META_WA_ACCESS_TOKEN},
+        )
+        return numero
+    return None
+
+
+def obter_numero_whatsapp(phone_number_id: str) -> Optional[NumeroWhatsApp]:
+    """Número ativo pelo ``phone_number_id`` da Meta, com cache de 60s."""
+    if not phone_number_id:
+        return None
+    chave = f"whatsapp:numero:{phone_number_id}"
+    numero = cache.get(chave)
+    if numero is None:
+        numero = NumeroWhatsApp.objects.filter(
+            phone_number_id=phone_number_id,
+            ativo=True,
+        ).first()
+        # Números desconhecidos não são cacheados: um cadastro novo vale na hora.
+        if numero is not None:
+            cache.set(chave, numero, 60)
+    return numero
+
+
+def _enfileirar_resposta_automatica(
+    contato: Contato,
+    texto: str,
+    numero: Optional[NumeroWhatsApp],
+    limitar: bool = True,
+) -> None:
+    """
+    Enfileira uma resposta do robô.
+
+    Com ``limitar``, a mesma resposta para o mesmo contato respeita o limite
+    por minuto. A mensagem é gravada na transação corrente, junto com a
+    mensagem recebida; o envio é feito depois pelo comando ``enviar_mensagens``.
+    """
+    if limitar and not _respostas_automaticas_por_contato.tentar(f"{contato.waid}:{texto}"):
+        logger.warning("Flood: resposta automática para %s suprimida pelo limite", contato.waid)
+        return
+    try:
+        with transaction.atomic():
+            _enfileirar(contato, texto, numero, automatica=True)
+    except Exception as e:  # noqa: BLE001
+        logger.exception("Fila: falha ao enfileirar resposta automática para %s - %s", contato.waid, e)
+
+
+def enfileirar_mensagem_whatsapp(
+    waid: str,
+    texto: str,
+    numero: Optional[NumeroWhatsApp] = None,
+    automatica: bool = False,
+) -> Mensagem:
+    """
+    Grava uma mensagem de saída na fila de envio do número.
+
+    Sem ``numero``, usa o número pelo qual o contato falou por último (se ainda
+    estiver ativo) ou o padrão. O envio para a API da Meta é feito pelo comando
+    ``enviar_mensagens``, com o pool e o limite de cada número, então quem
+    enfileira nunca espera pela API. Mensagens não automáticas contam como
+    primeira resposta do atendimento aberto.
+    """
+    contato = Contato.objects.select_related("numero").filter(waid=waid).first()
+    if contato is None:
+        contato, _ = Contato.objects.get_or_create(
+            waid=waid,
+            defaults={"nome": waid, "ultima_mensagem": texto},
+        )
+    mensagem = _enfileirar(contato, texto, numero, automatica)
+    if not automatica:
+        _registrar_primeira_resposta(waid, mensagem.timestamp)
+    return mensagem
+
+
+def _enfileirar(
+    contato: Contato,
+    texto: str,
+    numero: Optional[NumeroWhatsApp],
+    automatica: bool,
+) -> Mensagem:
+    if numero is None and contato.numero is not None and contato.numero.ativo:
+        numero = contato.numero
+    if numero is None:
+        numero = obter_numero_padrao()
+    if numero is None:
         raise RuntimeError("Configuração da API do WhatsApp não encontrada.")
 
+    contato.ultima_mensagem = texto
+    update_fields = ["ultima_mensagem", "atualizado_em"]
+    if contato.numero_id is None:
+        contato.numero = numero
+        update_fields.append("numero")
+    contato.save(update_fields=update_fields)
+
+    return Mensagem.objects.create(
+        contato=contato,
+        numero=numero,
+        texto=texto,
+        direcao=Mensagem.Direcao.SAIDA,
+        status=Mensagem.Status.ENFILEIRADA,
+        timestamp=timezone.now(),
+        automatica=automatica,
+    )
+
+
+def enviar_proxima_mensagem(numero: NumeroWhatsApp, fatia: int = 0, fatias: int = 1) -> bool:
+    """
+    Envia a mensagem enfileirada mais antiga do número e grava o resultado.
+
+    Com ``fatias > 1``, só considera os contatos cujo id cai na ``fatia``
+    informada: cada worker do número cuida das suas conversas, que continuam
+    saindo em ordem. A linha fica travada (``SKIP LOCKED``) durante o envio,
+    então processos concorrentes nunca enviam a mesma mensagem. Retorna
+    ``False`` se a fila da fatia estava vazia.
+    """
+    with transaction.atomic():
+        fila = Mensagem.objects.filter(
+            numero=numero,
+            direcao=Mensagem.Direcao.SAIDA,
+            status=Mensagem.Status.ENFILEIRADA,
+        )
+        if fatias > 1:
+            fila = fila.alias(fatia=Mod("contato_id", fatias)).filter(fatia=fatia)
+        mensagem = (
+            fila.select_for_update(skip_locked=True, of=("self",))
+            .select_related("contato")
+            .order_by("id")
+            .first()
+        )
+        if mensagem is None:
+            return False
+
+        mensagem.status, mensagem.meta_message_id = _postar_mensagem(
+            numero, mensagem.contato.waid, mensagem.texto
+        )
+        mensagem.save(update_fields=["status", "meta_message_id"])
+    return True
+
+
+def _postar_mensagem(numero: NumeroWhatsApp, waid: str, texto: str) -> tuple[str, str]:
+    """Envia um texto pela API do WhatsApp (Meta); retorna o status e o id da Meta."""
     url = (
         f"https://graph.facebook.com/"
         f"{settings.META_WA_API_VERSION}/"
-        f"{settings.META_WA_PHONE_NUMBER_ID}/messages"
+        f"{numero.phone_number_id}/messages"
     )
 
     headers = {
-        "Authorization": f"Bearer {settings.META_WA_ACCESS_TOKEN}",
+        "Authorization": f"Bearer {numero.access_token}",
         "Content-Type": "application/json",
     }
 
@@ -37,48 +271,396 @@ def enviar_mensagem_whatsapp(waid: str, texto: str) -> Mensagem:
         "text": {"body": texto},
     }
 
+    sessao, limitador = _recursos_do_numero(numero)
+    limitador.aguardar()
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-    except requests.RequestException as exc:
+        response = sessao.post(url, headers=headers, json=payload, timeout=10)
+    except requests.RequestException:
         logger.exception("Erro de rede ao enviar mensagem para %s", waid)
-        msg_status = Mensagem.Status.FALHA
-        meta_message_id: Optional[str] = None
-    else:
-        if response.ok:
-            msg_status = Mensagem.Status.ENVIADA
-            try:
-                data = response.json()
-                meta_message_id = (
-                    (data.get("messages") or [{}])[0].get("id")  # type: ignore[assignment]
-                )
-            except Exception:  # noqa: BLE001
-                meta_message_id = None
-        else:
-            logger.error(
-                "Falha ao enviar mensagem para %s: %s %s",
-                waid,
-                response.status_code,
-                response.text,
+        return Mensagem.Status.FALHA, ""
+
+    if not response.ok:
+        logger.error(
+            "Falha ao enviar mensagem para %s: %s %s",
+            waid,
+            response.status_code,
+            response.text,
+        )
+        return Mensagem.Status.FALHA, ""
+
+    try:
+        data = response.json()
+        meta_message_id = (data.get("messages") or [{}])[0].get("id") or ""
+    except Exception:  # noqa: BLE001
+        meta_message_id = ""
+    return Mensagem.Status.ENVIADA, meta_message_id
+
+
+def _registrar_primeira_resposta(waid: str, momento: datetime) -> None:
+    """
+    Carimba a primeira resposta do atendimento aberto do contato.
+
+    A linha do atendimento é travada: envios simultâneos de agentes esperam e,
+    ao reler a linha já carimbada, não contam uma segunda primeira resposta.
+    """
+    with transaction.atomic():
+        aberto = (
+            Atendimento.objects.select_for_update(of=("self",))
+            .filter(
+                contato__waid=waid,
+                status__in=[
+                    Atendimento.Status.AGUARDANDO,
+                    Atendimento.Status.EM_ATENDIMENTO,
+                ],
+                data_primeira_resposta__isnull=True,
+            )
+            .order_by("-data_inicio")
+            .first()
+        )
+        if aberto is not None:
+            aberto.data_primeira_resposta = momento
+            aberto.save(update_fields=["data_primeira_resposta"])
+
+
+def processar_payload_webhook(payload: dict, controlar_flood: bool = True) -> None:
+    """
+    Processa um payload do webhook da Meta: registra mensagens recebidas e
+    conduz a fila de atendimento.
+
+    Cada mensagem é gravada em uma transação própria, sob o lock do contato
+    (``_travar_contato``), então workers concorrentes não criam contatos ou
+    atendimentos duplicados para o mesmo waid. Mensagens cujo ``id`` da
+    Meta já foi registrado são ignoradas, então o mesmo payload pode ser
+    reprocessado sem duplicar registros nem respostas.
+
+    Com ``controlar_flood=False`` (reprocessamento da fila de mensagens mortas)
+    os limites por contato de roteamento e de respostas automáticas são ignorados.
+    """
+    entries = payload.get("entry", [])
+    for entry in entries:
+        changes = entry.get("changes", [])
+        for change in changes:
+            value = change.get("value", {})
+            messages = value.get("messages", [])
+            contacts = value.get("contacts", [])
+            numero = obter_numero_whatsapp(
+                (value.get("metadata") or {}).get("phone_number_id", "")
             )
-            msg_status = Mensagem.Status.FALHA
-            meta_message_id = None
+
+            for idx, message in enumerate(messages):
+                # Aceita qualquer waid (produção ou teste), ex: 982237891640106
+                waid = message.get("from")
+                if not waid:
+                    continue
+                waid = str(waid).strip()
+
+                contact_name = waid
+                if idx < len(contacts):
+                    profile = contacts[idx].get("profile") or {}
+                    contact_name = profile.get("name") or waid
+
+                with transaction.atomic():
+                    _travar_contato(waid)
+                    _processar_mensagem_recebida(
+                        message, waid, contact_name, numero, controlar_flood
+                    )
+
+
+def _processar_mensagem_recebida(
+    message: dict,
+    waid: str,
+    contact_name: str,
+    numero: Optional[NumeroWhatsApp],
+    controlar_flood: bool = True,
+) -> None:
+    """
+    Registra uma mensagem recebida e aplica as regras da fila de atendimento.
+
+    Toda mensagem é gravada, mas só passa pelo roteamento quando
+    ``_deve_rotear`` permite; as demais são contadas em
+    ``Contato.mensagens_coalescidas``.
+    """
+    msg_type = message.get("type")
+    texto = ""
+    if msg_type == "text":
+        texto = (message.get("text") or {}).get("body", "")
+    # Outros tipos (image, audio, etc.) podem ser expandidos depois
+
+    if not texto:
+        return
+
+    meta_message_id = message.get("id", "")
+    if (
+        meta_message_id
+        and Mensagem.objects.filter(
+            meta_message_id=meta_message_id,
+            direcao=Mensagem.Direcao.ENTRADA,
+        ).exists()
+    ):
+        return  # Já processada (reentrega da Meta ou reprocessamento)
+
+    ts_raw = message.get("timestamp")
+    if ts_raw:
+        try:
+            ts_dt = datetime.fromtimestamp(
+                int(ts_raw),
+                tz=dt_timezone.utc,
+            )
+        except (TypeError, ValueError):
+            ts_dt = timezone.now()
+    else:
+        ts_dt = timezone.now()
+
+    texto_limpo = texto.strip().lower()
+    rotear = not controlar_flood or _deve_rotear(waid, texto_limpo)
 
     contato, created = Contato.objects.get_or_create(
         waid=waid,
-        defaults={"nome": waid, "ultima_mensagem": texto},
+        defaults={
+            "nome": contact_name,
+            "ultima_mensagem": texto,
+            "numero": numero,
+            "mensagens_coalescidas": 0 if rotear else 1,
+        },
     )
     if not created:
         contato.ultima_mensagem = texto
-        contato.save(update_fields=["ultima_mensagem", "atualizado_em"])
+        update_fields = ["ultima_mensagem", "atualizado_em"]
+        if not rotear:
+            contato.mensagens_coalescidas = F("mensagens_coalescidas") + 1
+            update_fields.append("mensagens_coalescidas")
+        if numero is not None and contato.numero_id != numero.pk:
+            contato.numero = numero
+            update_fields.append("numero")
+        if contato.nome != contact_name and contact_name != waid:
+            contato.nome = contact_name
+            update_fields.append("nome")
+        contato.save(update_fields=update_fields)
 
-    mensagem = Mensagem.objects.create(
+    Mensagem.objects.create(
         contato=contato,
+        numero=numero,
         texto=texto,
-        direcao=Mensagem.Direcao.SAIDA,
-        status=msg_status,
-        timestamp=timezone.now(),
-        meta_message_id=meta_message_id or "",
+        direcao=Mensagem.Direcao.ENTRADA,
+        status=Mensagem.Status.ENTREGUE,
+        timestamp=ts_dt,
+        meta_message_id=meta_message_id,
     )
 
-    return mensagem
+    if not rotear:
+        logger.info("Flood: mensagem de %s gravada sem roteamento (coalescida)", waid)
+        return
+
+    estado = _rotear_fila(contato, texto_limpo, numero, controlar_flood)
+    transaction.on_commit(partial(_roteamento_por_contato.guardar_estado, waid, estado))
+
+
+def _deve_rotear(waid: str, texto_limpo: str) -> bool:
+    """
+    Decide se a mensagem passa pelo roteamento da fila ou é só gravada.
+
+    Comandos passam enquanto puderem mudar o atendimento; repetidos dentro da
+    janela (ex: dez "oi" com o menu já enviado) são coalescidos. Textos livres
+    consomem as fichas do limitador do contato.
+    """
+    if texto_limpo in _COMANDOS_FILA:
+        estado = _roteamento_por_contato.estado(waid, _JANELA_ROTEAMENTO)
+        return estado is None or texto_limpo in _COMANDOS_POR_ESTADO[estado]
+    return _roteamento_por_contato.tentar(waid)
+
+
+def esquecer_roteamento(waid: str) -> None:
+    """Descarta o estado de roteamento do contato (atendimento alterado fora da fila)."""
+    _roteamento_por_contato.esquecer_estado(waid)
+
+
+def _rotear_fila(
+    contato: Contato,
+    texto_limpo: str,
+    numero: Optional[NumeroWhatsApp],
+    controlar_flood: bool = True,
+) -> str:
+    """Aplica as regras da fila de atendimento; retorna o estado resultante."""
+    aberto = (
+        Atendimento.objects.filter(contato=contato)
+        .filter(
+            status__in=[
+                Atendimento.Status.AGUARDANDO,
+                Atendimento.Status.EM_ATENDIMENTO,
+            ]
+        )
+        .order_by("-data_inicio")
+        .first()
+    )
+
+    if aberto is None:
+        if texto_limpo != "oi":
+            return _SEM_ATENDIMENTO
+        Atendimento.objects.create(
+            contato=contato,
+            departamento=Atendimento.Departamento.SEM_DEPARTAMENTO,
+            status=Atendimento.Status.AGUARDANDO,
+        )
+        menu = (
+            "Olá! Escolha o departamento:\n"
+            "1 - Comercial\n2 - Financeiro\n3 - Técnico"
+        )
+        # O menu de um atendimento novo nunca é suprimido
+        _enfileirar_resposta_automatica(contato, menu, numero, limitar=False)
+        return _SEM_DEPARTAMENTO
+    if aberto.status == Atendimento.Status.EM_ATENDIMENTO:
+        return _EM_ATENDIMENTO  # Robô mudo; humano atende
+    if aberto.departamento != Atendimento.Departamento.SEM_DEPARTAMENTO:
+        return _NA_FILA
+    if texto_limpo not in ("1", "2", "3"):
+        return _SEM_DEPARTAMENTO
+
+    dept_map = {
+        "1": (Atendimento.Departamento.COMERCIAL, "Comercial"),
+        "2": (Atendimento.Departamento.FINANCEIRO, "Financeiro"),
+        "3": (Atendimento.Departamento.TECNICO, "Técnico"),
+    }
+    dept, label = dept_map[texto_limpo]
+    aberto.contato = contato
+    aberto.departamento = dept
+    aberto.save(update_fields=["departamento"])
+    msg_fila = f"Você está na fila do {label}. Aguarde um momento."
+    _enfileirar_resposta_automatica(contato, msg_fila, numero, controlar_flood)
+    return _NA_FILA
+
+
+def _json_canonico(payload: dict) -> str:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+
+def fingerprint_payload(payload: dict) -> str:
+    """Hash estável do payload (independe da ordem das chaves)."""
+    return hashlib.sha256(_json_canonico(payload).encode("utf-8")).hexdigest()
+
+
+_spool_lock = threading.Lock()
+
+
+def _gravar_spool_falha(payload: dict, fingerprint: str, descricao: str) -> None:
+    """Acrescenta o payload ao arquivo de falhas (uma linha JSON por payload)."""
+    caminho = Path(settings.WEBHOOK_SPOOL_FALHAS)
+    linha = json.dumps(
+        {
+            "fingerprint": fingerprint,
+            "erro": descricao,
+            "payload": _json_canonico(payload),
+        },
+        separators=(",", ":"),
+    )
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with _spool_lock, caminho.open("a", encoding="utf-8") as arquivo:
+        arquivo.write(linha + "\n")
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+
+
+def importar_spool_falhas() -> int:
+    """
+    Move para ``FalhaWebhook`` os payloads gravados no arquivo de falhas.
+
+    O arquivo é renomeado antes da leitura, então o webhook continua gravando
+    em um arquivo novo enquanto a importação acontece. Um arquivo renomeado só
+    é apagado depois de importado por completo; se a importação falhar, ele é
+    retomado na próxima chamada. Retorna quantos payloads novos foram criados.
+    """
+    caminho = Path(settings.WEBHOOK_SPOOL_FALHAS)
+    arquivos = sorted(caminho.parent.glob(f"{caminho.name}.importando.*"))
+    if caminho.exists():
+        destino = caminho.with_name(f"{caminho.name}.importando.{time.time_ns()}")
+        os.replace(caminho, destino)
+        arquivos.append(destino)
+
+    criados = 0
+    for arquivo in arquivos:
+        with arquivo.open(encoding="utf-8") as linhas:
+            for numero_linha, linha in enumerate(linhas, start=1):
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                    payload = json.loads(registro["payload"])
+                except (ValueError, KeyError):
+                    logger.error("Spool %s: linha %s ilegível: %s", arquivo, numero_linha, linha)
+                    continue
+                fingerprint = fingerprint_payload(payload)
+                _, created = FalhaWebhook.objects.get_or_create(
+                    fingerprint=fingerprint,
+                    defaults={"payload": payload, "erro": registro.get("erro", "")},
+                )
+                if not created:
+                    FalhaWebhook.objects.filter(fingerprint=fingerprint).update(
+                        status=FalhaWebhook.Status.PENDENTE,
+                        tentativas=F("tentativas") + 1,
+                        atualizado_em=timezone.now(),
+                    )
+                criados += created
+        arquivo.unlink()
+    return criados
+
+
+def registrar_falha_webhook(payload: dict, erro: BaseException) -> Optional[FalhaWebhook]:
+    """
+    Guarda na fila de mensagens mortas um payload que falhou no processamento.
+
+    Payloads repetidos (mesmo fingerprint) incrementam ``tentativas``. Se nem o
+    registro for possível (ex: banco fora do ar), o payload vai para o arquivo
+    ``WEBHOOK_SPOOL_FALHAS`` e, em último caso, para o log.
+    """
+    fingerprint = fingerprint_payload(payload)
+    descricao = f"{type(erro).__name__}: {erro}"
+    try:
+        falha, created = FalhaWebhook.objects.get_or_create(
+            fingerprint=fingerprint,
+            defaults={"payload": payload, "erro": descricao},
+        )
+        if not created:
+            falha.erro = descricao
+            falha.status = FalhaWebhook.Status.PENDENTE
+            falha.tentativas += 1
+            falha.save(update_fields=["erro", "status", "tentativas", "atualizado_em"])
+    except Exception:  # noqa: BLE001
+        logger.exception("Webhook: falha ao registrar payload %s na fila de mortas", fingerprint)
+        try:
+            _gravar_spool_falha(payload, fingerprint, descricao)
+        except OSError:
+            logger.exception(
+                "Webhook: falha ao gravar payload %s no spool: %s",
+                fingerprint,
+                json.dumps(payload),
+            )
+        return None
+    return falha
+
+
+def reprocessar_falha_webhook(falha_id: int) -> bool:
+    """
+    Reprocessa um payload da fila de mensagens mortas.
+
+    Retorna ``True`` em caso de sucesso (ou se já havia sido reprocessado).
+    Em caso de nova falha, o erro e o número de tentativas são atualizados.
+    """
+    falha = FalhaWebhook.objects.filter(
+        pk=falha_id,
+        status=FalhaWebhook.Status.PENDENTE,
+    ).first()
+    if falha is None:
+        return True
+
+    try:
+        processar_payload_webhook(falha.payload, controlar_flood=False)
+    except Exception as e:  # noqa: BLE001
+        logger.exception("Reprocessamento: falha #%s continua com erro - %s", falha_id, e)
+        falha.erro = f"{type(e).__name__}: {e}"
+        falha.tentativas += 1
+        falha.save(update_fields=["erro", "tentativas", "atualizado_em"])
+        return False
 
+    falha.status = FalhaWebhook.Status.REPROCESSADO
+    falha.reprocessado_em = timezone.now()
+    falha.save(update_fields=["status", "reprocessado_em", "atualizado_em"])
+    return True
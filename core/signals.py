@@ -0,0 +1,35 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Atendimento, Contato
+from .services import esquecer_roteamento
+
+CHAVE_VERSAO_CONTATOS = "dashboard:contatos:versao"
+
+
+def versao_contatos() -> int:
+    """Contador incrementado a cada exclusão de contato (ver ``_versao_dashboard``)."""
+    return cache.get(CHAVE_VERSAO_CONTATOS, 0)
+
+
+@receiver(post_delete, sender=Contato)
+def contato_excluido(sender, instance, **kwargs):
+    cache.add(CHAVE_VERSAO_CONTATOS, 0, None)
+    try:
+        cache.incr(CHAVE_VERSAO_CONTATOS)
+    except ValueError:
+        # A chave expirou entre o add e o incr: recomeça a contagem.
+        cache.set(CHAVE_VERSAO_CONTATOS, 1, None)
+
+
+@receiver(post_save, sender=Atendimento)
+@receiver(post_delete, sender=Atendimento)
+def atendimento_alterado(sender, instance, update_fields=None, **kwargs):
+    """Faz o próximo comando do contato passar pelo roteamento (ex: agente finalizou)."""
+    if update_fields is not None and set(update_fields) <= {"data_primeira_resposta"}:
+        return
+    transaction.on_commit(partial(esquecer_roteamento, instance.contato.waid))
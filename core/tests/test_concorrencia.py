@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import threading
+from functools import partial
+from typing import Callable
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TransactionTestCase
+
+from core.metricas import consolidar_metricas
+from core.models import Atendimento, Contato, Mensagem, MetricaAtendimento
+from core.services import enfileirar_mensagem_whatsapp, processar_payload_webhook
+from core.tests.utils import cadastrar_numero, payload_texto, respostas_enfileiradas
+
+
+@skipUnless(connection.vendor == "postgresql", "Depende dos advisory locks do Postgres")
+class ProcessamentoConcorrenteTests(TransactionTestCase):
+    """Stress: vários workers processando mensagens do mesmo contato ao mesmo tempo."""
+
+    THREADS = 16
+
+    def setUp(self):
+        cadastrar_numero()
+
+    def _em_paralelo(self, tarefas: list[Callable[[], object]]) -> None:
+        barreira = threading.Barrier(len(tarefas))
+        erros: list[Exception] = []
+
+        def worker(tarefa: Callable[[], object]) -> None:
+            try:
+                barreira.wait()
+                tarefa()
+            except Exception as e:  # noqa: BLE001
+                erros.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(tarefa,)) for tarefa in tarefas]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(erros, [])
+
+    def _processar_em_paralelo(self, payloads: list[dict]) -> None:
+        self._em_paralelo([partial(processar_payload_webhook, payload) for payload in payloads])
+
+    def test_rajada_do_mesmo_contato_abre_um_atendimento(self):
+        waid = "5511900000001"
+        self._processar_em_paralelo(
+            [payload_texto(waid, f"wamid.rajada.{i}", "oi") for i in range(self.THREADS)]
+        )
+
+        self.assertEqual(Contato.objects.filter(waid=waid).count(), 1)
+        self.assertEqual(Atendimento.objects.filter(contato__waid=waid).count(), 1)
+        self.assertEqual(
+            Mensagem.objects.filter(contato__waid=waid, direcao=Mensagem.Direcao.ENTRADA).count(),
+            self.THREADS,
+        )
+        self.assertEqual(respostas_enfileiradas(waid), 1)  # Um único menu
+
+    def test_reentrega_da_mesma_mensagem_grava_uma_vez(self):
+        waid = "5511900000002"
+        self._processar_em_paralelo(
+            [payload_texto(waid, "wamid.reentregue", "oi") for _ in range(self.THREADS)]
+        )
+
+        self.assertEqual(Mensagem.objects.filter(meta_message_id="wamid.reentregue").count(), 1)
+        self.assertEqual(Atendimento.objects.filter(contato__waid=waid).count(), 1)
+        self.assertEqual(respostas_enfileiradas(waid), 1)
+
+    def test_contatos_diferentes_processam_em_paralelo(self):
+        waids = [f"55119000001{i:02d}" for i in range(self.THREADS)]
+        self._processar_em_paralelo(
+            [payload_texto(waid, f"wamid.{waid}", "oi") for waid in waids]
+        )
+
+        self.assertEqual(Atendimento.objects.filter(contato__waid__in=waids).count(), self.THREADS)
+        self.assertEqual(sum(respostas_enfileiradas(waid) for waid in waids), self.THREADS)
+
+    def test_respostas_simultaneas_de_agentes_contam_uma_primeira_resposta(self):
+        contato = Contato.objects.create(waid="5511900000003", nome="Ana")
+        Atendimento.objects.create(contato=contato)
+        self._em_paralelo(
+            [
+                partial(enfileirar_mensagem_whatsapp, contato.waid, f"Resposta {i}")
+                for i in range(self.THREADS)
+            ]
+        )
+
+        consolidar_metricas()
+        self.assertEqual(
+            MetricaAtendimento.objects.get(periodo=MetricaAtendimento.Periodo.DIA).primeiras_respostas,
+            1,
+        )
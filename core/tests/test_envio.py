@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.models import Contato, Mensagem
+from core.services import (
+    _recursos_do_numero,
+    enfileirar_mensagem_whatsapp,
+    enviar_proxima_mensagem,
+    obter_numero_whatsapp,
+    processar_payload_webhook,
+)
+from core.tests.utils import cadastrar_numero, payload_texto
+
+
+class FilaEnvioTests(TestCase):
+    """Mensagens de saída são enfileiradas por número e enviadas pelo worker."""
+
+    def setUp(self):
+        cache.clear()
+        self.vendas = cadastrar_numero("200000000000001", nome="Vendas")
+        self.suporte = cadastrar_numero("200000000000002", nome="Suporte")
+
+    @mock.patch("core.services._postar_mensagem", return_value=(Mensagem.Status.ENVIADA, "wamid.out"))
+    def test_webhook_so_enfileira_e_worker_do_numero_envia(self, postar):
+        payload = payload_texto("5511920000001", "wamid.in.1", "oi")
+        payload["entry"][0]["changes"][0]["value"]["metadata"] = {
+            "phone_number_id": self.suporte.phone_number_id,
+        }
+        processar_payload_webhook(payload)
+
+        menu = Mensagem.objects.get(direcao=Mensagem.Direcao.SAIDA)
+        self.assertEqual(menu.status, Mensagem.Status.ENFILEIRADA)
+        self.assertEqual(menu.numero, self.suporte)
+        postar.assert_not_called()
+
+        # A fila de outro número não vê a mensagem
+        self.assertFalse(enviar_proxima_mensagem(self.vendas))
+        self.assertTrue(enviar_proxima_mensagem(self.suporte))
+        self.assertFalse(enviar_proxima_mensagem(self.suporte))
+
+        menu.refresh_from_db()
+        self.assertEqual(menu.status, Mensagem.Status.ENVIADA)
+        self.assertEqual(menu.meta_message_id, "wamid.out")
+        postar.assert_called_once_with(self.suporte, "5511920000001", menu.texto)
+
+    def test_numero_inativo_do_contato_cai_no_padrao(self):
+        self.suporte.ativo = False
+        self.suporte.save()
+        Contato.objects.create(waid="5511920000002", nome="Cliente", numero=self.suporte)
+
+        mensagem = enfileirar_mensagem_whatsapp("5511920000002", "Olá")
+
+        self.assertEqual(mensagem.numero, self.vendas)
+
+    def test_recursos_refeitos_quando_o_cadastro_muda(self):
+        sessao, limitador = _recursos_do_numero(self.vendas)
+        self.assertEqual(_recursos_do_numero(self.vendas), (sessao, limitador))
+
+        self.vendas.mensagens_por_segundo = 5
+        self.vendas.save()
+        nova_sessao, novo_limitador = _recursos_do_numero(self.vendas)
+
+        self.assertIsNot(nova_sessao, sessao)
+        self.assertIsNot(novo_limitador, limitador)
+
+    def test_numero_desconhecido_nao_fica_em_cache(self):
+        self.assertIsNone(obter_numero_whatsapp("200000000000003"))
+
+        novo = cadastrar_numero("200000000000003")
+
+        self.assertEqual(obter_numero_whatsapp("200000000000003"), novo)
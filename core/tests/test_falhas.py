@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+
+from core.models import FalhaWebhook, Mensagem
+from core.services import (
+    importar_spool_falhas,
+    registrar_falha_webhook,
+    reprocessar_falha_webhook,
+)
+from core.tests.utils import cadastrar_numero, payload_texto
+
+
+class SpoolFalhasTests(TestCase):
+    """Payloads que não chegam à fila de mortas no banco vão para o spool em disco."""
+
+    def setUp(self):
+        cadastrar_numero()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.spool = Path(diretorio.name) / "falhas.jsonl"
+        configuracao = override_settings(WEBHOOK_SPOOL_FALHAS=str(self.spool))
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def test_banco_fora_do_ar_grava_spool_e_reprocessamento_importa(self):
+        payload = payload_texto("5511930000001", "wamid.spool.1", "oi")
+        with mock.patch.object(
+            FalhaWebhook.objects, "get_or_create", side_effect=OperationalError("banco fora do ar")
+        ):
+            self.assertIsNone(registrar_falha_webhook(payload, RuntimeError("boom")))
+        self.assertEqual(len(self.spool.read_text(encoding="utf-8").splitlines()), 1)
+        self.assertFalse(FalhaWebhook.objects.exists())
+
+        self.assertEqual(importar_spool_falhas(), 1)
+        falha = FalhaWebhook.objects.get()
+        self.assertEqual(falha.payload, payload)
+        self.assertEqual(list(self.spool.parent.iterdir()), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(reprocessar_falha_webhook(falha.pk))
+        falha.refresh_from_db()
+        self.assertEqual(falha.status, FalhaWebhook.Status.REPROCESSADO)
+        self.assertTrue(Mensagem.objects.filter(meta_message_id="wamid.spool.1").exists())
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from unittest import mock
+
+from django.test import TestCase
+
+from core.models import Atendimento, Contato, FalhaWebhook, Mensagem
+from core import services
+from core.services import processar_payload_webhook, reprocessar_falha_webhook
+from core.tests.utils import cadastrar_numero, payload_texto, respostas_enfileiradas
+
+
+class ControleFloodTests(TestCase):
+    """Rajadas por contato: tudo é gravado, só o excedente sem comando é coalescido."""
+
+    def setUp(self):
+        cadastrar_numero()
+
+    def _processar(self, waid: str, textos: list[str], prefixo: str) -> None:
+        # Cada mensagem é confirmada antes da próxima, como no webhook
+        for i, texto in enumerate(textos):
+            with self.captureOnCommitCallbacks(execute=True):
+                processar_payload_webhook(payload_texto(waid, f"{prefixo}.{i}", texto))
+
+    def test_escolha_de_departamento_nunca_e_coalescida(self):
+        waid = "5511910000001"
+        self._processar(
+            waid,
+            ["oi", "bom dia", "preciso de ajuda", "tem alguém?", "alô", "1"],
+            "wamid.escolha",
+        )
+
+        atendimento = Atendimento.objects.get(contato__waid=waid)
+        self.assertEqual(atendimento.departamento, Atendimento.Departamento.COMERCIAL)
+        self.assertEqual(Mensagem.objects.filter(contato__waid=waid, direcao=Mensagem.Direcao.ENTRADA).count(), 6)
+        # Comandos não consomem fichas: só o 4º texto livre passa da rajada de 3
+        self.assertEqual(Contato.objects.get(waid=waid).mensagens_coalescidas, 1)
+        self.assertEqual(respostas_enfileiradas(waid), 2)  # Menu e aviso de fila
+
+    def test_comandos_repetidos_sem_efeito_sao_coalescidos(self):
+        waid = "5511910000004"
+        with mock.patch.object(services, "_rotear_fila", wraps=services._rotear_fila) as rotear:
+            self._processar(waid, ["oi"] * 10, "wamid.oi")
+            self.assertEqual(rotear.call_count, 1)
+            self._processar(waid, ["2"] * 5, "wamid.dois")
+            self.assertEqual(rotear.call_count, 2)
+
+        self.assertEqual(Atendimento.objects.get(contato__waid=waid).departamento, Atendimento.Departamento.FINANCEIRO)
+        self.assertEqual(Contato.objects.get(waid=waid).mensagens_coalescidas, 13)
+        self.assertEqual(respostas_enfileiradas(waid), 2)  # Um menu e um aviso de fila
+
+    def test_menu_de_atendimento_novo_nunca_e_suprimido(self):
+        waid = "5511910000005"
+        self._processar(waid, ["oi", "2"], "wamid.primeiro")
+        atendimento = Atendimento.objects.get(contato__waid=waid)
+        with self.captureOnCommitCallbacks(execute=True):
+            atendimento.status = Atendimento.Status.FINALIZADO
+            atendimento.save()
+        self._processar(waid, ["oi", "2"], "wamid.segundo")
+
+        self.assertEqual(Atendimento.objects.filter(contato__waid=waid).count(), 2)
+        self.assertEqual(
+            Mensagem.objects.filter(contato__waid=waid, automatica=True, texto__startswith="Olá!").count(),
+            2,
+        )
+        self.assertEqual(respostas_enfileiradas(waid), 4)
+
+    def test_texto_livre_excedente_e_coalescido_e_contado(self):
+        waid = "5511910000002"
+        self._processar(waid, ["spam"] * 10, "wamid.spam")
+
+        self.assertEqual(Mensagem.objects.filter(contato__waid=waid, direcao=Mensagem.Direcao.ENTRADA).count(), 10)
+        self.assertEqual(Contato.objects.get(waid=waid).mensagens_coalescidas, 7)
+
+    def test_reprocessamento_ignora_o_controle_de_flood(self):
+        waid = "5511910000003"
+        self._processar(waid, ["spam"] * 5, "wamid.antes")
+        payloads = [
+            payload_texto(waid, "wamid.morta.0", "oi"),
+            *[payload_texto(waid, f"wamid.morta.{i}", "texto") for i in range(1, 5)],
+            payload_texto(waid, "wamid.morta.5", "3"),
+        ]
+        falhas = [
+            FalhaWebhook.objects.create(fingerprint=f"{i:064d}", payload=payload)
+            for i, payload in enumerate(payloads)
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for falha in falhas:
+                self.assertTrue(reprocessar_falha_webhook(falha.pk))
+
+        atendimento = Atendimento.objects.get(contato__waid=waid)
+        self.assertEqual(atendimento.departamento, Atendimento.Departamento.TECNICO)
+        self.assertEqual(Contato.objects.get(waid=waid).mensagens_coalescidas, 2)
+        self.assertEqual(respostas_enfileiradas(waid), 2)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.metricas import consolidar_metricas
+from core.models import Atendimento, Contato, EventoMetrica, MetricaAtendimento
+from core.services import enfileirar_mensagem_whatsapp
+from core.tests.utils import cadastrar_numero
+
+
+class MetricasTests(TestCase):
+    """Eventos registrados pelos atendimentos e consolidados em MetricaAtendimento."""
+
+    def setUp(self):
+        cadastrar_numero()
+        self.agente = User.objects.create_user("agente")
+        self.contato = Contato.objects.create(waid="5511940000001", nome="Ana")
+
+    def _linhas(self) -> list[tuple]:
+        return sorted(
+            MetricaAtendimento.objects.values_list(
+                "periodo",
+                "inicio",
+                "departamento",
+                "agente_id",
+                "atendimentos_abertos",
+                "atendimentos_finalizados",
+                "esperas",
+                "espera_total_segundos",
+                "primeiras_respostas",
+                "primeira_resposta_total_segundos",
+            )
+        )
+
+    def _atender(self) -> None:
+        atendimento = Atendimento.objects.create(contato=self.contato)
+        atendimento = Atendimento.objects.get(pk=atendimento.pk)
+        atendimento.departamento = Atendimento.Departamento.COMERCIAL
+        atendimento.save(update_fields=["departamento"])
+        enfileirar_mensagem_whatsapp(self.contato.waid, "Olá, sou o agente")
+        atendimento = Atendimento.objects.get(pk=atendimento.pk)
+        atendimento.status = Atendimento.Status.EM_ATENDIMENTO
+        atendimento.agente_responsavel = self.agente
+        atendimento.save()
+        atendimento.status = Atendimento.Status.FINALIZADO
+        atendimento.save()
+
+    def test_save_so_registra_eventos(self):
+        self._atender()
+
+        self.assertTrue(EventoMetrica.objects.exists())
+        self.assertFalse(MetricaAtendimento.objects.exists())
+
+    def test_consolidacao_bate_com_a_reconstrucao(self):
+        self._atender()
+        Atendimento.objects.create(contato=self.contato)
+
+        self.assertGreater(consolidar_metricas(), 0)
+        self.assertFalse(EventoMetrica.objects.exists())
+        incremental = self._linhas()
+        call_command("recalcular_metricas", stdout=StringIO())
+
+        self.assertEqual(incremental, self._linhas())
+        linha = MetricaAtendimento.objects.get(
+            periodo=MetricaAtendimento.Periodo.DIA,
+            departamento=Atendimento.Departamento.COMERCIAL,
+        )
+        self.assertEqual(linha.agente, self.agente)
+        self.assertEqual(
+            (linha.atendimentos_abertos, linha.atendimentos_finalizados, linha.primeiras_respostas),
+            (1, 1, 1),
+        )
+
+    def test_primeira_resposta_conta_uma_vez(self):
+        Atendimento.objects.create(contato=self.contato)
+        enfileirar_mensagem_whatsapp(self.contato.waid, "Olá")
+        enfileirar_mensagem_whatsapp(self.contato.waid, "Ainda aí?")
+
+        consolidar_metricas()
+
+        self.assertEqual(
+            MetricaAtendimento.objects.get(periodo=MetricaAtendimento.Periodo.DIA).primeiras_respostas,
+            1,
+        )
+
+    def test_relatorio_consolida_e_agrupa(self):
+        self._atender()
+        saida = StringIO()
+
+        call_command("relatorio_sla", por="departamento,agente", stdout=saida)
+
+        linhas = saida.getvalue().splitlines()
+        self.assertEqual(len(linhas), 2)
+        self.assertTrue(linhas[1].startswith("COMERCIAL"))
+        self.assertFalse(EventoMetrica.objects.exists())
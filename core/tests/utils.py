@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from core.models import Mensagem, NumeroWhatsApp
+
+
+def cadastrar_numero(phone_number_id: str = "100000000000001", **campos) -> NumeroWhatsApp:
+    """Número ativo usado nas respostas automáticas enfileiradas."""
+    campos.setdefault("nome", "Teste")
+    campos.setdefault("access_token", "token-teste")
+    return NumeroWhatsApp.objects.create(phone_number_id=phone_number_id, **campos)
+
+
+def respostas_enfileiradas(waid: str) -> int:
+    """Quantas respostas do robô foram enfileiradas para o contato."""
+    return Mensagem.objects.filter(
+        contato__waid=waid,
+        direcao=Mensagem.Direcao.SAIDA,
+        automatica=True,
+        status=Mensagem.Status.ENFILEIRADA,
+    ).count()
+
+
+def payload_texto(waid: str, message_id: str, texto: str) -> dict:
+    """Payload do webhook da Meta com uma única mensagem de texto."""
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "id": "teste",
+                "changes": [
+                    {
+                        "value": {
+                            "contacts": [{"profile": {"name": "Cliente Teste"}}],
+                            "messages": [
+                                {
+                                    "from": waid,
+                                    "id": message_id,
+                                    "timestamp": "1700000000",
+                                    "type": "text",
+                                    "text": {"body": texto},
+                                }
+                            ],
+                        }
+                    }
+                ],
+            }
+        ],
+    }
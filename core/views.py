@@ -1,23 +1,75 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 from datetime import datetime
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db.models import Max
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils import timezone
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 
-from .models import Atendimento, Cliente, Contato, Mensagem
-from .services import enviar_mensagem_whatsapp
+from .models import Contato
+from .services import (
+    enfileirar_mensagem_whatsapp,
+    processar_payload_webhook,
+    registrar_falha_webhook,
+)
+from .signals import versao_contatos
 
 logger = logging.getLogger(__name__)
 
 
+def _versao_dashboard(request: HttpRequest) -> dict:
+    """
+    Versão atual do dashboard, calculada com uma única consulta agregada.
+
+    Toda mensagem (entrada ou saída) atualiza ``Contato.atualizado_em``, então o
+    maior ``atualizado_em`` muda sempre que chega algo novo. Os dois máximos são
+    lidos direto dos índices; exclusões não mexem neles e são detectadas pelo
+    contador que ``signals.contato_excluido`` incrementa no cache. O resultado
+    fica memorizado no request para ser reaproveitado por ETag e Last-Modified.
+    """
+    versao = getattr(request, "_versao_dashboard", None)
+    if versao is None:
+        versao = Contato.objects.aggregate(
+            atualizado_em=Max("atualizado_em"),
+            ultimo_id=Max("id"),
+        )
+        versao["exclusoes"] = versao_contatos()
+        request._versao_dashboard = versao
+    return versao
+
+
+def _dashboard_etag(request: HttpRequest, contato_id: int | None = None) -> str:
+    versao = _versao_dashboard(request)
+    atualizado_em = versao["atualizado_em"]
+    # O cookie CSRF entra na ETag porque o formulário de envio embute o token.
+    partes = [
+        str(request.user.pk),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+        str(contato_id or ""),
+        str(versao["ultimo_id"] or ""),
+        str(versao["exclusoes"]),
+        atualizado_em.isoformat() if atualizado_em else "",
+    ]
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()
+
+
+def _dashboard_last_modified(
+    request: HttpRequest, contato_id: int | None = None
+) -> datetime | None:
+    return _versao_dashboard(request)["atualizado_em"]
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_dashboard_etag, last_modified_func=_dashboard_last_modified)
 def dashboard(request: HttpRequest, contato_id: int | None = None) -> HttpResponse:
     contatos = Contato.objects.all()
 
@@ -30,17 +82,24 @@ def dashboard(request: HttpRequest, contato_id: int | None = None) -> HttpRespon
     if request.method == "POST" and contato_selecionado:
         texto = request.POST.get("texto", "").strip()
         if texto:
-            enviar_mensagem_whatsapp(contato_selecionado.waid, texto)
+            enfileirar_mensagem_whatsapp(contato_selecionado.waid, texto)
         return redirect("core:dashboard_contato", contato_id=contato_selecionado.id)
 
     mensagens = (
         contato_selecionado.mensagens.all() if contato_selecionado is not None else []
     )
+    # Chave do cache de fragmento: muda a cada nova mensagem da conversa.
+    ultima_mensagem_id = (
+        contato_selecionado.mensagens.aggregate(ultimo_id=Max("id"))["ultimo_id"]
+        if contato_selecionado is not None
+        else None
+    )
 
     context = {
         "contatos": contatos,
         "contato_selecionado": contato_selecionado,
         "mensagens": mensagens,
+        "ultima_mensagem_id": ultima_mensagem_id,
     }
     return render(request, "core/dashboard.html", context)
 
@@ -51,7 +110,8 @@ def webhook(request: HttpRequest) -> HttpResponse:
     Webhook de integração com a API do WhatsApp (Meta).
 
     - GET: verificação de token (setup no painel do Meta).
-    - POST: recebimento de mensagens. Sempre retorna 200 para a Meta.
+    - POST: recebimento de mensagens. Sempre retorna 200 para a Meta; payloads
+      que falham vão para a fila de mensagens mortas (``FalhaWebhook``).
     """
     # Log de depuração global (antes de qualquer validação)
     logger.info(
@@ -84,123 +144,10 @@ def webhook(request: HttpRequest) -> HttpResponse:
         return HttpResponse(status=200)
 
     try:
-        entries = payload.get("entry", [])
-        for entry in entries:
-            changes = entry.get("changes", [])
-            for change in changes:
-                value = change.get("value", {})
-                messages = value.get("messages", [])
-                contacts = value.get("contacts", [])
-
-                for idx, message in enumerate(messages):
-                    # Aceita qualquer waid (produção ou teste), ex: 982237891640106
-                    waid = message.get("from")
-                    if not waid:
-                        continue
-                    waid = str(waid).strip()
-
-                    contact_name = waid
-                    if idx < len(contacts):
-                        profile = contacts[idx].get("profile") or {}
-                        contact_name = profile.get("name") or waid
-
-                    msg_type = message.get("type")
-                    texto = ""
-                    if msg_type == "text":
-                        texto = (message.get("text") or {}).get("body", "")
-                    # Outros tipos (image, audio, etc.) podem ser expandidos depois
-
-                    if not texto:
-                        continue
-
-                    ts_raw = message.get("timestamp")
-                    if ts_raw:
-                        try:
-                            ts_dt = datetime.fromtimestamp(
-                                int(ts_raw),
-                                tz=timezone.utc,
-                            )
-                        except (TypeError, ValueError):
-                            ts_dt = timezone.now()
-                    else:
-                        ts_dt = timezone.now()
-
-                    contato, created = Contato.objects.get_or_create(
-                        waid=waid,
-                        defaults={
-                            "nome": contact_name,
-                            "ultima_mensagem": texto,
-                        },
-                    )
-                    if not created:
-                        contato.ultima_mensagem = texto
-                        contato.save(update_fields=["ultima_mensagem", "atualizado_em"])
-
-                    Mensagem.objects.create(
-                        contato=contato,
-                        texto=texto,
-                        direcao=Mensagem.Direcao.ENTRADA,
-                        status=Mensagem.Status.ENTREGUE,
-                        timestamp=ts_dt,
-                        meta_message_id=message.get("id", ""),
-                    )
-
-                    # --- Fila de atendimento ---
-                    cliente, _ = Cliente.objects.get_or_create(
-                        telefone=waid,
-                        defaults={"nome": contact_name},
-                    )
-                    if cliente.nome != contact_name and contact_name != waid:
-                        cliente.nome = contact_name
-                        cliente.save(update_fields=["nome"])
-
-                    aberto = (
-                        Atendimento.objects.filter(cliente=cliente)
-                        .filter(
-                            status__in=[
-                                Atendimento.Status.AGUARDANDO,
-                                Atendimento.Status.EM_ATENDIMENTO,
-                            ]
-                        )
-                        .order_by("-data_inicio")
-                        .first()
-                    )
-
-                    texto_limpo = texto.strip().lower()
-                    if aberto and aberto.status == Atendimento.Status.EM_ATENDIMENTO:
-                        continue  # Robô mudo; humano atende
-                    if texto_limpo == "oi":
-                        if not aberto:
-                            Atendimento.objects.create(
-                                cliente=cliente,
-                                departamento=Atendimento.Departamento.SEM_DEPARTAMENTO,
-                                status=Atendimento.Status.AGUARDANDO,
-                            )
-                            menu = (
-                                "Olá! Escolha o departamento:\n"
-                                "1 - Comercial\n2 - Financeiro\n3 - Técnico"
-                            )
-                            try:
-                                enviar_mensagem_whatsapp(waid, menu)
-                            except Exception as e:
-                                logger.exception("Fila: falha ao enviar menu - %s", e)
-                        continue
-                    if texto_limpo in ("1", "2", "3") and aberto and aberto.departamento == Atendimento.Departamento.SEM_DEPARTAMENTO:
-                        dept_map = {
-                            "1": (Atendimento.Departamento.COMERCIAL, "Comercial"),
-                            "2": (Atendimento.Departamento.FINANCEIRO, "Financeiro"),
-                            "3": (Atendimento.Departamento.TECNICO, "Técnico"),
-                        }
-                        dept, label = dept_map[texto_limpo]
-                        aberto.departamento = dept
-                        aberto.save(update_fields=["departamento"])
-                        msg_fila = f"Você está na fila do {label}. Aguarde um momento."
-                        try:
-                            enviar_mensagem_whatsapp(waid, msg_fila)
-                        except Exception as e:
-                            logger.exception("Fila: falha ao enviar msg fila - %s", e)
+        processar_payload_webhook(payload)
     except Exception as e:
         logger.exception("Webhook POST: erro ao processar mensagens - %s", e)
+        registrar_falha_webhook(payload, e)
         return HttpResponse(status=200)
 
     return HttpResponse(status=200)
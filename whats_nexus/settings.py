@@ -56,8 +56,16 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -83,6 +91,16 @@ DATABASES = {
     }
 }
 
+# Cache local por processo; usado pelo cache de fragmento do dashboard e pelo
+# contador de exclusões de contatos. Com mais de um processo servindo o
+# dashboard, troque por um cache compartilhado (Redis/Memcached).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "whats-nexus",
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -117,6 +135,8 @@ LOGOUT_REDIRECT_URL = "/login/"
 LOGIN_URL = "/login/"
 
 # Meta / WhatsApp API basic config (placeholders, read from env)
+# Os números ficam em core.NumeroWhatsApp; PHONE_NUMBER_ID/ACCESS_TOKEN abaixo
+# só servem de número padrão legado (migrado para o banco em 0005).
 META_WA_PHONE_NUMBER_ID = env("META_WA_PHONE_NUMBER_ID", default="")
 META_WA_ACCESS_TOKEN = env("META_WA_ACCESS_TOKEN", default="")
 META_WA_API_VERSION = env("META_WA_API_VERSION", default="v21.0")
@@ -125,3 +145,18 @@ META_WA_VERIFY_TOKEN = env("META_WA_VERIFY_TOKEN", default="whats-nexus-verify-t
 # Docker injeta via environment; fallback para django-environ (.env)
 WHATSAPP_VERIFY_TOKEN = os.getenv("WHATSAPP_VERIFY_TOKEN", env("WHATSAPP_VERIFY_TOKEN", default=""))
 
+# Arquivo (JSON lines) onde o webhook grava os payloads com falha quando nem a
+# fila de mensagens mortas no banco está disponível; o comando
+# reprocessar_webhooks importa esse arquivo antes de reprocessar.
+WEBHOOK_SPOOL_FALHAS = env("WEBHOOK_SPOOL_FALHAS", default=str(BASE_DIR / "var" / "falhas_webhook.jsonl"))
+
+
+# Controle de flood por contato (por processo): textos livres passam pelo
+# roteamento no máximo WHATSAPP_ROTEAMENTO_RAJADA vezes seguidas e depois uma vez
+# a cada WHATSAPP_ROTEAMENTO_JANELA_SEGUNDOS; comandos da fila ("oi", "1"-"3")
+# repetidos na janela sem efeito possível também são só gravados. Janela 0
+# desativa o controle. Respostas automáticas idênticas para o mesmo contato
+# ficam limitadas a WHATSAPP_RESPOSTAS_AUTOMATICAS_POR_MINUTO (0 desativa).
+WHATSAPP_ROTEAMENTO_RAJADA = env.int("WHATSAPP_ROTEAMENTO_RAJADA", default=3)
+WHATSAPP_ROTEAMENTO_JANELA_SEGUNDOS = env.float("WHATSAPP_ROTEAMENTO_JANELA_SEGUNDOS", default=10.0)
+WHATSAPP_RESPOSTAS_AUTOMATICAS_POR_MINUTO = env.int("WHATSAPP_RESPOSTAS_AUTOMATICAS_POR_MINUTO", default=2)